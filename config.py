@@ -44,6 +44,48 @@ INSTA_COOKIES = os.getenv("INSTA_COOKIES", INST_COOKIES)
 FREEMIUM_LIMIT = int(os.getenv("FREEMIUM_LIMIT", "0"))
 PREMIUM_LIMIT  = int(os.getenv("PREMIUM_LIMIT", "500"))
 
+# ─── BATCH ENGINE ───────────────────────────────────────────────────────────────
+BATCH_WORKERS     = int(os.getenv("BATCH_WORKERS", "3"))      # concurrent workers per /batch job
+MAX_BATCH_WORKERS = int(os.getenv("MAX_BATCH_WORKERS", "8"))  # upper bound a user can request
+PIPELINE_DEPTH    = int(os.getenv("PIPELINE_DEPTH", "4"))     # items downloading ahead of the current upload
+PREFETCH_DISK_MB  = int(os.getenv("PREFETCH_DISK_MB", "4096"))  # disk budget for prefetched files per batch
+CLIENT_POOL_SIZE  = int(os.getenv("CLIENT_POOL_SIZE", "50"))   # max started per-user bots / sessions each
+CLIENT_IDLE_TIMEOUT = int(os.getenv("CLIENT_IDLE_TIMEOUT", "900"))  # seconds before an idle client is stopped
+USER_CACHE_TTL    = int(os.getenv("USER_CACHE_TTL", "300"))   # seconds a cached user settings document stays valid
+CONTENT_CACHE_DAYS = int(os.getenv("CONTENT_CACHE_DAYS", "7"))  # unused uploads are forgotten after this many days
+DOWNLOAD_ENGINE   = os.getenv("DOWNLOAD_ENGINE", "default")    # "default" or "parallel" (per-job: add fast/normal)
+DOWNLOAD_CONNECTIONS = int(os.getenv("DOWNLOAD_CONNECTIONS", "4"))  # media sessions used by the parallel engine
+UPLOAD_ENGINE     = os.getenv("UPLOAD_ENGINE", "default")      # "default" or "parallel" (files above 10 MiB)
+UPLOAD_WORKERS    = int(os.getenv("UPLOAD_WORKERS", "4"))     # concurrent saveBigFilePart sessions per upload
+TRANSFER_MODE     = os.getenv("TRANSFER_MODE", "disk")         # "disk" or "relay" (stream documents/audio, no disk)
+RELAY_MEMORY_MB   = int(os.getenv("RELAY_MEMORY_MB", "20"))   # relayed files up to this size go through RAM whole
+RELAY_WINDOW      = int(os.getenv("RELAY_WINDOW", "8"))       # 512 KiB parts buffered between download and upload
+PROBE_CONCURRENCY = int(os.getenv("PROBE_CONCURRENCY", "4"))  # ffprobe/ffmpeg probes running at once, process-wide
+PACE_START_RATE   = float(os.getenv("PACE_START_RATE", "0.5"))  # items/s an account starts at
+PACE_MIN_RATE     = float(os.getenv("PACE_MIN_RATE", "0.05"))   # floor after repeated FloodWaits
+PACE_MAX_RATE     = float(os.getenv("PACE_MAX_RATE", "3"))      # ceiling reached by additive increase
+PACE_STEP         = float(os.getenv("PACE_STEP", "0.05"))       # items/s added per successful item
+
+# ─── RATE LIMITS (requests/second per account) ──────────────────────────────────
+EDIT_RATE  = float(os.getenv("EDIT_RATE", "2"))    # message edits (progress bars, status)
+SEND_RATE  = float(os.getenv("SEND_RATE", "5"))    # sends, media sends and forwards
+MEDIA_RATE = float(os.getenv("MEDIA_RATE", "10"))  # message/history fetches
+PROGRESS_INTERVAL = float(os.getenv("PROGRESS_INTERVAL", "5"))  # seconds between progress edits per chat
+BATCH_UI   = os.getenv("BATCH_UI", "dashboard")  # "dashboard" (one live message) or "items" (per-file messages)
+
+# ─── YT-DLP ─────────────────────────────────────────────────────────────────────
+YTDL_WORKERS    = int(os.getenv("YTDL_WORKERS", "2"))       # yt-dlp worker processes running at once
+YTDL_TIMEOUT    = int(os.getenv("YTDL_TIMEOUT", "1800"))    # seconds before a stuck job is killed
+YTDL_CACHE_SIZE = int(os.getenv("YTDL_CACHE_SIZE", "256"))  # links remembered (upload to resend, extracted info)
+YTDL_INFO_TTL   = int(os.getenv("YTDL_INFO_TTL", "3600"))   # seconds extracted info is reused; stream URLs expire
+YTDL_FRAGMENTS  = int(os.getenv("YTDL_FRAGMENTS", "4"))     # HLS/DASH fragments fetched at once (generic sites)
+YTDL_FRAGMENTS_YOUTUBE   = int(os.getenv("YTDL_FRAGMENTS_YOUTUBE", "8"))    # same, for YouTube
+YTDL_FRAGMENTS_INSTAGRAM = int(os.getenv("YTDL_FRAGMENTS_INSTAGRAM", "2"))  # same, for Instagram
+YTDL_ARIA2C     = os.getenv("YTDL_ARIA2C", "auto")          # "auto" (aria2c for direct files when installed) or "off"
+YTDL_CONNECTIONS = int(os.getenv("YTDL_CONNECTIONS", "8"))  # aria2c connections per file
+YTDL_MAX_MB     = int(os.getenv("YTDL_MAX_MB", "2048"))     # /dl picks the best format whose size fits this
+YTDL_MAX_HEIGHT = int(os.getenv("YTDL_MAX_HEIGHT", "1080")) # and whose height does not exceed this
+
 # ─── UI / LINKS ─────────────────────────────────────────────────────────────────
 JOIN_LINK     = os.getenv("JOIN_LINK", "https://t.me/team_spy_pro")
 ADMIN_CONTACT = os.getenv("ADMIN_CONTACT", "https://t.me/username_of_admin")
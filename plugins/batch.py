@@ -2,64 +2,68 @@
 # Licensed under the GNU General Public License v3.0.  
 # See LICENSE file in the repository root for full license text.
 
-import os, re, time, asyncio, json, asyncio 
+import os, re, time, asyncio 
 from pyrogram import Client, filters
 from pyrogram.types import Message
 from pyrogram.errors import UserNotParticipant
 from config import API_ID, API_HASH, LOG_GROUP, STRING, FORCE_SUB, FREEMIUM_LIMIT, PREMIUM_LIMIT
+from config import BATCH_WORKERS, MAX_BATCH_WORKERS, PIPELINE_DEPTH, PREFETCH_DISK_MB
+from config import CLIENT_POOL_SIZE, CLIENT_IDLE_TIMEOUT, DOWNLOAD_ENGINE, DOWNLOAD_CONNECTIONS
+from config import UPLOAD_ENGINE, UPLOAD_WORKERS, BATCH_UI, PROGRESS_INTERVAL
+from config import TRANSFER_MODE, RELAY_MEMORY_MB, RELAY_WINDOW
 from utils.func import get_user_data, screenshot, thumbnail, get_video_metadata
 from utils.func import get_user_data_key, process_text_with_rules, is_premium_user, E
 from shared_client import app as X
-from plugins.settings import rename_file
+from plugins.settings import rename_file, renamed_name
 from plugins.start import subscribe as sub
 from utils.custom_filters import login_in_progress
 from utils.encrypt import dcs
+from utils.journal import JsonJournal
+from utils.peers import resolve_cached, remember_peer, forget_peer
+from utils.client_pool import ClientPool
+from utils import content_cache
+from utils.transfer import parallel_download, parallel_upload, relay_upload, send_uploaded, BIG_FILE
+from utils.pacing import pacer_for, RETRY_AFTER
+from utils.ratelimit import install
+from utils import progress, thumbs
 from typing import Dict, Any, Optional
 
 
 Y = None if not STRING else __import__('shared_client').userbot
-Z, P, UB, UC, emp = {}, {}, {}, {}, {}
+Z, emp = {}, {}
+UB = ClientPool("UB", CLIENT_POOL_SIZE, CLIENT_IDLE_TIMEOUT)
+UC = ClientPool("UC", CLIENT_POOL_SIZE, CLIENT_IDLE_TIMEOUT)
+RUNNING = {}
 
 ACTIVE_USERS = {}
 ACTIVE_USERS_FILE = "active_users.json"
+ACTIVE_USERS_JOURNAL = JsonJournal(ACTIVE_USERS_FILE)
 
 # fixed directory file_name problems 
 def sanitize(filename):
     return re.sub(r'[<>:"/\\|?*\']', '_', filename).strip(" .")[:255]
 
 def load_active_users():
-    try:
-        if os.path.exists(ACTIVE_USERS_FILE):
-            with open(ACTIVE_USERS_FILE, 'r') as f:
-                return json.load(f)
-        return {}
-    except Exception:
-        return {}
-
-async def save_active_users_to_file():
-    try:
-        with open(ACTIVE_USERS_FILE, 'w') as f:
-            json.dump(ACTIVE_USERS, f)
-    except Exception as e:
-        print(f"Error saving active users: {e}")
+    return ACTIVE_USERS_JOURNAL.load()
 
 async def add_active_batch(user_id: int, batch_info: Dict[str, Any]):
-    ACTIVE_USERS[str(user_id)] = batch_info
-    await save_active_users_to_file()
+    ACTIVE_USERS_JOURNAL.set(str(user_id), batch_info)
 
 def is_user_active(user_id: int) -> bool:
     return str(user_id) in ACTIVE_USERS
 
-async def update_batch_progress(user_id: int, current: int, success: int):
-    if str(user_id) in ACTIVE_USERS:
-        ACTIVE_USERS[str(user_id)]["current"] = current
-        ACTIVE_USERS[str(user_id)]["success"] = success
-        await save_active_users_to_file()
+async def set_batch_fields(user_id: int, fields: Dict[str, Any]):
+    ACTIVE_USERS_JOURNAL.update(str(user_id), fields)
+
+async def update_batch_progress(user_id: int, current: int, success: int, last_id: Optional[int] = None):
+    fields = {"current": current, "success": success}
+    if last_id is not None:
+        fields["last_id"] = last_id
+    await set_batch_fields(user_id, fields)
 
 async def request_batch_cancel(user_id: int):
     if str(user_id) in ACTIVE_USERS:
-        ACTIVE_USERS[str(user_id)]["cancel_requested"] = True
-        await save_active_users_to_file()
+        await set_batch_fields(user_id, {"cancel_requested": True})
         return True
     return False
 
@@ -67,14 +71,89 @@ def should_cancel(user_id: int) -> bool:
     user_str = str(user_id)
     return user_str in ACTIVE_USERS and ACTIVE_USERS[user_str].get("cancel_requested", False)
 
-async def remove_active_batch(user_id: int):
+async def request_batch_pause(user_id: int):
     if str(user_id) in ACTIVE_USERS:
-        del ACTIVE_USERS[str(user_id)]
-        await save_active_users_to_file()
+        await set_batch_fields(user_id, {"pause_requested": True})
+        return True
+    return False
+
+def should_stop(user_id: int) -> bool:
+    info = ACTIVE_USERS.get(str(user_id)) or {}
+    return info.get("cancel_requested", False) or info.get("pause_requested", False)
+
+async def remove_active_batch(user_id: int):
+    ACTIVE_USERS_JOURNAL.delete(str(user_id))
 
 def get_batch_info(user_id: int) -> Optional[Dict[str, Any]]:
     return ACTIVE_USERS.get(str(user_id))
 
+class BatchHalted(Exception):
+    """Raised at the gate of an item queued behind one that a pause or cancel left unprocessed."""
+
+class ReorderBuffer:
+    """Lets batch items finish out of order but releases them in source-id order."""
+    def __init__(self, start: int = 0, success: int = 0):
+        self.next = start
+        self.success = success
+        self.done = {}
+        self.halted = None  # first index a stop left unprocessed
+        self.cond = asyncio.Condition()
+
+    def _behind_halt(self, idx: int) -> bool:
+        return self.halted is not None and idx > self.halted
+
+    async def wait(self, idx: int):
+        async with self.cond:
+            await self.cond.wait_for(lambda: self.next == idx or self._behind_halt(idx))
+            if self.next != idx:
+                raise BatchHalted(idx)
+
+    async def admit(self, idx: int, depth: int):
+        # keep at most `depth` items in flight ahead of the one being released
+        async with self.cond:
+            await self.cond.wait_for(lambda: idx < self.next + depth or self._behind_halt(idx))
+
+    async def halt(self, idx: int):
+        # idx is never released, so checkpoints stay before it and /resume starts there
+        async with self.cond:
+            self.halted = idx if self.halted is None else min(self.halted, idx)
+            self.cond.notify_all()
+
+    async def release(self, idx: int, ok: bool = False):
+        # only items below `next` count as committed, which is what checkpoints record
+        async with self.cond:
+            self.done[idx] = ok
+            while self.next in self.done:
+                self.success += self.done.pop(self.next)
+                self.next += 1
+            self.cond.notify_all()
+
+class ByteBudget:
+    """Caps the bytes of prefetched files on disk; the head item never waits, as holders may wait on it."""
+    def __init__(self, limit: int, buf: ReorderBuffer):
+        self.limit = limit
+        self.used = 0
+        self.buf = buf
+        self.cond = buf.cond
+
+    async def acquire(self, n: int, idx: Optional[int] = None):
+        async with self.cond:
+            # a single file larger than the whole budget may still run on its own
+            await self.cond.wait_for(lambda: self.used == 0 or self.used + n <= self.limit or idx == self.buf.next)
+            self.used += n
+
+    async def release(self, n: int):
+        async with self.cond:
+            self.used = max(0, self.used - n)
+            self.cond.notify_all()
+
+def media_size(m) -> int:
+    for attr in ('video', 'audio', 'document', 'photo', 'voice', 'video_note'):
+        media = getattr(m, attr, None)
+        if media:
+            return getattr(media, 'file_size', 0) or 0
+    return 0
+
 ACTIVE_USERS = load_active_users()
 
 async def upd_dlg(c):
@@ -85,6 +164,15 @@ async def upd_dlg(c):
         print(f'Failed to update dialogs: {e}')
         return False
 
+async def warm_peer(c, chat):
+    """Makes `chat` resolvable by `c`, sweeping dialogs only on a peer-cache miss."""
+    if await resolve_cached(c, chat) is not None:
+        return True
+    if not await upd_dlg(c):
+        return False
+    await remember_peer(c, chat, chat)
+    return True
+
 # fixed the old group of 2021-2022 extraction 🌝 (buy krne ka fayda nhi ab old group) ✅ 
 async def get_msg(c, u, i, d, lt):
     try:
@@ -116,6 +204,14 @@ async def get_msg(c, u, i, d, lt):
         else:
             if u:
                 try:
+                    cached = await resolve_cached(u, i)
+                    if cached is not None:
+                        try:
+                            result = await u.get_messages(cached, d)
+                            return result if result and not getattr(result, "empty", False) else None
+                        except Exception:
+                            forget_peer(u, i)
+
                     async for _ in u.get_dialogs(limit=50): pass
                     
                     # Try with -100 prefix first
@@ -135,6 +231,7 @@ async def get_msg(c, u, i, d, lt):
                     try:
                         result = await u.get_messages(chat_id_100, d)
                         if result and not getattr(result, "empty", False):
+                            await remember_peer(u, i, chat_id_100)
                             return result
                     except Exception:
                         pass
@@ -143,6 +240,7 @@ async def get_msg(c, u, i, d, lt):
                     try:
                         result = await u.get_messages(chat_id_dash, d)
                         if result and not getattr(result, "empty", False):
+                            await remember_peer(u, i, chat_id_dash)
                             return result
                     except Exception:
                         pass
@@ -152,6 +250,7 @@ async def get_msg(c, u, i, d, lt):
                         async for _ in u.get_dialogs(limit=200): pass
                         result = await u.get_messages(i, d)
                         if result and not getattr(result, "empty", False):
+                            await remember_peer(u, i, i)
                             return result
                     except Exception:
                         pass
@@ -167,15 +266,131 @@ async def get_msg(c, u, i, d, lt):
         return None
 
 
+class MessagePrefetcher:
+    """Fetches a batch id range with multi-id get_messages, a few chunks ahead of the workers."""
+    CHUNK = 200
+
+    def __init__(self, c, u, i, s, n, lt, start=0, ahead=2):
+        self.c, self.u, self.i, self.s, self.n, self.lt = c, u, i, int(s), n, lt
+        self.start, self.ahead = start, ahead
+        self.src = None
+        self.chunks, self.left = {}, {}
+        self.started = set()
+
+    def _ids(self, k):
+        # only ids the workers will ask for: a resumed job starts past the first chunk's start
+        lo = max(self.s + k * self.CHUNK, self.s + self.start)
+        return range(lo, min(self.s + (k + 1) * self.CHUNK, self.s + self.n))
+
+    def _served(self, k):
+        """Counts one id of chunk k as handed out, however it was fetched; frees the chunk after its last."""
+        self.left[k] = self.left.get(k, len(self._ids(k))) - 1
+        if self.left[k] <= 0:
+            self.left.pop(k, None)
+            self.chunks.pop(k, None)
+            self.started.add(k)
+
+    async def _fetch(self, k):
+        client, chat = self.src
+        msgs = await client.get_messages(chat, list(self._ids(k)), replies=0)
+        return {x.id: x for x in msgs if x}
+
+    def close(self):
+        for task in self.chunks.values():
+            task.cancel()
+        self.chunks.clear()
+
+    async def get(self, mid):
+        k = (mid - self.s) // self.CHUNK
+        if not self.src:
+            self._served(k)
+            # resolve the source once through the regular path, then switch to bulk fetches
+            msg = await get_msg(self.c, self.u, self.i, mid, self.lt)
+            if msg and not getattr(msg, "empty", False) and getattr(msg, "chat", None):
+                client = self.c if self.lt == 'public' and not emp.get(self.i) else self.u
+                self.src = (client, msg.chat.id)
+            return msg
+
+        last = (self.n - 1) // self.CHUNK
+        for a in range(k, min(k + self.ahead, last) + 1):
+            if a not in self.started:
+                self.started.add(a)
+                self.chunks[a] = asyncio.create_task(self._fetch(a))
+
+        task = self.chunks.get(k)
+        self._served(k)
+        got = {}
+        if task:
+            try:
+                got = await task
+            except Exception as e:
+                print(f'Bulk fetch failed for chunk {k}: {e}')
+
+        msg = got.pop(mid, None)
+        if msg is None:
+            return await get_msg(self.c, self.u, self.i, mid, self.lt)
+        return None if getattr(msg, "empty", False) else msg
+
+
+class BatchDashboard:
+    """One live status message per batch, pushed through the progress scheduler by a timer."""
+
+    def __init__(self, uid, pt, pacer):
+        self.uid, self.pt, self.pacer = uid, pt, pacer
+        self.items = {}   # message id -> [phase, bytes done, bytes total]
+        self.errors = []
+        self.moved = 0
+        self.started = time.time()
+        self.task = None
+
+    def phase(self, mid, text):
+        self.items.setdefault(mid, [text, 0, 0])[0] = text
+
+    async def progress(self, cur, total, mid):
+        item = self.items.setdefault(mid, ['Transferring', 0, 0])
+        self.moved += cur - item[1] if cur >= item[1] else cur  # a new transfer restarts at 0
+        item[1], item[2] = cur, total
+
+    def finish(self, mid, res, ok):
+        self.items.pop(mid, None)
+        if not ok and res:
+            self.errors = (self.errors + [f'{mid}: {res}'])[-3:]
+
+    def render(self):
+        info = get_batch_info(self.uid) or {}
+        speed = self.moved / max(time.time() - self.started, 1) / (1024 * 1024)
+        lines = [f"📦 **Batch** {info.get('current', 0)}/{info.get('total', 0)} · ✅ {info.get('success', 0)}",
+                 f"🚀 {speed:.2f} MB/s · ⏱ {self.pacer.describe()}"]
+        for mid, (ph, done, total) in sorted(self.items.items()):
+            lines.append(f"• `{mid}` {ph}" + (f" {done * 100 / total:.0f}%" if total else ''))
+        if self.errors:
+            lines.append('\n⚠️ ' + '\n⚠️ '.join(self.errors))
+        return '\n'.join(lines)
+
+    async def _run(self):
+        while True:
+            progress.update(self.pt.chat.id, self.pt.id, self.pt.edit, self.render())
+            await asyncio.sleep(PROGRESS_INTERVAL)
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+        await progress.done(self.pt.chat.id, self.pt.id)
+
 async def get_ubot(uid):
     bt = await get_user_data_key(uid, "bot_token", None)
     if not bt: return None
-    if uid in UB: return UB.get(uid)
-    try:
-        bot = Client(f"user_{uid}", bot_token=bt, api_id=API_ID, api_hash=API_HASH)
+
+    async def start():
+        bot = install(Client(f"user_{uid}", bot_token=bt, api_id=API_ID, api_hash=API_HASH))
         await bot.start()
-        UB[uid] = bot
         return bot
+
+    try:
+        return await UB.acquire(uid, start)
     except Exception as e:
         print(f"Error starting bot for user {uid}: {e}")
         return None
@@ -188,32 +403,27 @@ async def get_uclient(uid):
     if not ud: return ubot if ubot else None
     xxx = ud.get('session_string')
     if xxx:
-        try:
-            ss = dcs(xxx)
-            gg = Client(f'{uid}_client', api_id=API_ID, api_hash=API_HASH, device_model="v3saver", session_string=ss)
+        async def start():
+            gg = install(Client(f'{uid}_client', api_id=API_ID, api_hash=API_HASH, device_model="v3saver", session_string=dcs(xxx)))
             await gg.start()
-            await upd_dlg(gg)
-            UC[uid] = gg
             return gg
+
+        try:
+            return await UC.acquire(uid, start)
         except Exception as e:
             print(f'User client error: {e}')
             return ubot if ubot else Y
     return Y
 
 async def prog(c, t, C, h, m, st):
-    global P
     p = c / t * 100
-    interval = 10 if t >= 100 * 1024 * 1024 else 20 if t >= 50 * 1024 * 1024 else 30 if t >= 10 * 1024 * 1024 else 50
-    step = int(p // interval) * interval
-    if m not in P or P[m] != step or p >= 100:
-        P[m] = step
-        c_mb = c / (1024 * 1024)
-        t_mb = t / (1024 * 1024)
-        bar = '🟢' * int(p / 10) + '🔴' * (10 - int(p / 10))
-        speed = c / (time.time() - st) / (1024 * 1024) if time.time() > st else 0
-        eta = time.strftime('%M:%S', time.gmtime((t - c) / (speed * 1024 * 1024))) if speed > 0 else '00:00'
-        await C.edit_message_text(h, m, f"__**Pyro Handler...**__\n\n{bar}\n\n⚡**__Completed__**: {c_mb:.2f} MB / {t_mb:.2f} MB\n📊 **__Done__**: {p:.2f}%\n🚀 **__Speed__**: {speed:.2f} MB/s\n⏳ **__ETA__**: {eta}\n\n**__Powered by Team SPY__**")
-        if p >= 100: P.pop(m, None)
+    c_mb = c / (1024 * 1024)
+    t_mb = t / (1024 * 1024)
+    bar = '🟢' * int(p / 10) + '🔴' * (10 - int(p / 10))
+    speed = c / (time.time() - st) / (1024 * 1024) if time.time() > st else 0
+    eta = time.strftime('%M:%S', time.gmtime((t - c) / (speed * 1024 * 1024))) if speed > 0 else '00:00'
+    progress.update(h, m, lambda text: C.edit_message_text(h, m, text),
+                    f"__**Pyro Handler...**__\n\n{bar}\n\n⚡**__Completed__**: {c_mb:.2f} MB / {t_mb:.2f} MB\n📊 **__Done__**: {p:.2f}%\n🚀 **__Speed__**: {speed:.2f} MB/s\n⏳ **__ETA__**: {eta}\n\n**__Powered by Team SPY__**")
 
 async def send_direct(c, m, tcid, ft=None, rtmid=None):
     try:
@@ -239,7 +449,72 @@ async def send_direct(c, m, tcid, ft=None, rtmid=None):
         print(f'Direct send error: {e}')
         return False
 
-async def process_msg(c, u, m, d, lt, uid, i):
+async def after_send(aw):
+    """Awaits a cleanup or bookkeeping call made once an item's media is out. Its errors,
+    FloodWait included, must not reach the worker, which would re-run and resend the item."""
+    try:
+        return await aw
+    except Exception as e:
+        print(f'Post-send step failed: {e}')
+
+async def copy_from_log(c, d, mid, attempts=3):
+    # the file is already in LOG_GROUP, so a FloodWait is waited out here instead of re-running the item
+    for n in range(attempts):
+        try:
+            return await c.copy_message(d, LOG_GROUP, mid)
+        except RETRY_AFTER as e:
+            if n == attempts - 1:
+                raise RuntimeError(f'copy still rate limited after {attempts} tries')
+            await asyncio.sleep(e.value)
+
+async def wait_flood(c, uid, e):
+    # the file is still on disk, so after a FloodWait only the send is retried, not the item
+    pacer = pacer_for(c)
+    pacer.flood(e.value)
+    await pacer.wait()
+    if should_stop(uid): raise BatchHalted()
+
+async def upload_fast(c, chat, f, kind, opts, **kw):
+    """Send f with the parallel upload engine if the job uses it; None means fall back to send_*."""
+    if not kind or (opts or {}).get('ul', UPLOAD_ENGINE) != 'parallel' or os.path.getsize(f) <= BIG_FILE:
+        return None
+    track = {k: kw.pop(k) for k in ('progress', 'progress_args') if k in kw}
+    try:
+        file = await parallel_upload(c, f, UPLOAD_WORKERS, **track)
+    except RETRY_AFTER:
+        raise
+    except Exception as e:
+        print(f'Parallel upload failed, using default engine: {e}')
+        return None
+    # past this point the file may already be posted, so errors propagate instead of falling back
+    return await send_uploaded(c, chat, file, os.path.basename(f), kind, **kw)
+
+async def relay_msg(c, u, m, tcid, rtmid, caption, name, kind, th, gate, track):
+    """Moves m's document/audio from u to c without writing it to disk; None means fall back to disk."""
+    # small files go through RAM whole, larger ones stream RELAY_WINDOW parts at a time
+    whole = media_size(m) <= RELAY_MEMORY_MB * 1024 * 1024
+    try:
+        if whole:
+            file = await u.download_media(m, in_memory=True, **track())
+            file.name = name
+        else:
+            file = await relay_upload(u, m, c, name, UPLOAD_WORKERS, RELAY_WINDOW, **track())
+    except RETRY_AFTER:
+        raise
+    except Exception as e:
+        print(f'Relay failed, falling back to disk: {e}')
+        return None
+    if gate: await gate()
+    # past this point the file may already be posted, so errors propagate instead of falling back
+    if whole and kind == 'audio':
+        return await c.send_audio(tcid, audio=file, caption=caption, thumb=th, reply_to_message_id=rtmid, **track())
+    if whole:
+        return await c.send_document(tcid, document=file, caption=caption, reply_to_message_id=rtmid, **track())
+    return await send_uploaded(c, tcid, file, name, kind, caption=caption, thumb=th if kind == 'audio' else None,
+                               duration=getattr(m.audio, 'duration', 0), reply_to_message_id=rtmid)
+
+async def process_msg(c, u, m, d, lt, uid, i, gate=None, budget=None, opts=None, dash=None, idx=None):
+    held, p, f = 0, None, None
     try:
         cfg_chat = await get_user_data_key(d, 'chat_id', None)
         tcid = d
@@ -259,11 +534,30 @@ async def process_msg(c, u, m, d, lt, uid, i):
             ft = f'{proc_text}\n\n{user_cap}' if proc_text and user_cap else user_cap if user_cap else proc_text
             
             if lt == 'public' and not emp.get(i, False):
+                if gate: await gate()
                 await send_direct(c, m, tcid, ft, rtmid)
                 return 'Sent directly.'
             
+            cv = await content_cache.variant(d)
+            hit = await content_cache.lookup(i, m, cv)
+            if hit:
+                if gate: await gate()
+                if await content_cache.send_cached(c, hit, tcid, ft if m.caption else None, rtmid):
+                    return 'Done (cached).'
+            
             st = time.time()
-            p = await c.send_message(d, 'Downloading...')
+            if dash:
+                dash.phase(m.id, 'Downloading')
+            else:
+                p = await c.send_message(d, 'Downloading...')
+
+            async def say(text):
+                if dash: dash.phase(m.id, text.rstrip('.'))
+                else: await c.edit_message_text(d, p.id, text)
+
+            def track():
+                if dash: return {'progress': dash.progress, 'progress_args': (m.id,)}
+                return {'progress': prog, 'progress_args': (c, d, p.id, st)}
 
             c_name = f"{time.time()}"
             if m.video:
@@ -284,19 +578,43 @@ async def process_msg(c, u, m, d, lt, uid, i):
             elif m.photo:
                 file_name = f"{time.time()}.jpg"
                 c_name = sanitize(file_name)
+
+            video_extensions = ['.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm', '.m4v', '.3gp', '.ogv']
+            audio_extensions = ['.mp3', '.wav', '.flac', '.aac', '.ogg', '.wma', '.m4a', '.opus', '.aiff', '.ac3']
+            has_name = (m.audio and m.audio.file_name) or (m.document and m.document.file_name)
+
+            # documents and audio need no random access (thumbnails, probing), so they can skip the disk
+            ext = os.path.splitext(file_name)[1].lower()
+            relay = ('audio' if m.audio or (m.document and ext in audio_extensions)
+                     else 'document' if m.document and ext not in video_extensions else None)
+            if relay and (opts or {}).get('io', TRANSFER_MODE) == 'relay' and media_size(m) <= 2000 * 1024 ** 2:
+                await say('Relaying...')
+                name = os.path.basename(await renamed_name(file_name, d) if has_name else file_name)
+                sent = await relay_msg(c, u, m, tcid, rtmid, ft if m.caption else None, name, relay, thumbnail(d), gate, track)
+                if sent:
+                    if p: await after_send(c.delete_messages(d, p.id))
+                    await after_send(content_cache.store(c, i, m, cv, sent))
+                    return 'Done (relayed).'
     
-            f = await u.download_media(m, file_name=c_name, progress=prog, progress_args=(c, d, p.id, st))
+            if budget:
+                held = media_size(m)
+                await budget.acquire(held, idx)
+            f = None
+            if (opts or {}).get('dl', DOWNLOAD_ENGINE) == 'parallel' and (m.video or m.document or m.audio):
+                try:
+                    f = await parallel_download(u, m, c_name, DOWNLOAD_CONNECTIONS, **track())
+                except Exception as e:
+                    print(f'Parallel download failed, using default engine: {e}')
+            if not f:
+                f = await u.download_media(m, file_name=c_name, **track())
+            if p: await progress.done(d, p.id)
             
             if not f:
-                await c.edit_message_text(d, p.id, 'Failed.')
+                await say('Failed.')
                 return 'Failed.'
             
-            await c.edit_message_text(d, p.id, 'Renaming...')
-            if (
-                (m.video and m.video.file_name) or
-                (m.audio and m.audio.file_name) or
-                (m.document and m.document.file_name)
-            ):
+            await say('Renaming...')
+            if (m.video and m.video.file_name) or has_name:
                 f = await rename_file(f, d, p)
             
             fsize = os.path.getsize(f) / (1024 * 1024 * 1024)
@@ -304,91 +622,251 @@ async def process_msg(c, u, m, d, lt, uid, i):
             
             if fsize > 2 and Y:
                 st = time.time()
-                await c.edit_message_text(d, p.id, 'File is larger than 2GB. Using alternative method...')
-                await upd_dlg(Y)
+                await say('File is larger than 2GB. Using alternative method...')
+                await warm_peer(Y, LOG_GROUP)
                 mtd = await get_video_metadata(f)
                 dur, h, w = mtd['duration'], mtd['width'], mtd['height']
                 th = await screenshot(f, dur, d)
+                kind = 'video' if m.video or f.endswith('.mp4') else 'audio' if m.audio else 'document' if m.document else None
+                while True:
+                    try:
+                        sent = await upload_fast(Y, LOG_GROUP, f, kind, opts, caption=ft if m.caption else None, thumb=th,
+                                                 duration=dur, width=w, height=h, reply_to_message_id=rtmid, **track())
                 
-                send_funcs = {'video': Y.send_video, 'video_note': Y.send_video_note, 
-                            'voice': Y.send_voice, 'audio': Y.send_audio, 
-                            'photo': Y.send_photo, 'document': Y.send_document}
+                        send_funcs = {'video': Y.send_video, 'video_note': Y.send_video_note, 
+                                    'voice': Y.send_voice, 'audio': Y.send_audio, 
+                                    'photo': Y.send_photo, 'document': Y.send_document}
                 
-                for mtype, func in send_funcs.items():
-                    if f.endswith('.mp4'): mtype = 'video'
-                    if getattr(m, mtype, None):
-                        sent = await func(LOG_GROUP, f, thumb=th if mtype == 'video' else None, 
-                                        duration=dur if mtype == 'video' else None,
-                                        height=h if mtype == 'video' else None,
-                                        width=w if mtype == 'video' else None,
-                                        caption=ft if m.caption and mtype not in ['video_note', 'voice'] else None, 
-                                        reply_to_message_id=rtmid, progress=prog, progress_args=(c, d, p.id, st))
+                        for mtype, func in send_funcs.items():
+                            if sent: break
+                            if f.endswith('.mp4'): mtype = 'video'
+                            if getattr(m, mtype, None):
+                                sent = await func(LOG_GROUP, f, thumb=th if mtype == 'video' else None, 
+                                                duration=dur if mtype == 'video' else None,
+                                                height=h if mtype == 'video' else None,
+                                                width=w if mtype == 'video' else None,
+                                                caption=ft if m.caption and mtype not in ['video_note', 'voice'] else None, 
+                                                reply_to_message_id=rtmid, **track())
+                                break
+                        else:
+                            sent = await Y.send_document(LOG_GROUP, f, thumb=th, caption=ft if m.caption else None,
+                                                        reply_to_message_id=rtmid, **track())
                         break
-                else:
-                    sent = await Y.send_document(LOG_GROUP, f, thumb=th, caption=ft if m.caption else None,
-                                                reply_to_message_id=rtmid, progress=prog, progress_args=(c, d, p.id, st))
+                    except RETRY_AFTER as e:
+                        await wait_flood(Y, uid, e)
                 
-                await c.copy_message(d, LOG_GROUP, sent.id)
-                os.remove(f)
-                await c.delete_messages(d, p.id)
+                if not getattr(sent, 'id', None):  # posted, but the reply could not be parsed
+                    return 'Uploaded to the log group, but could not copy it here.'
+                if gate: await gate()
+                copied = await copy_from_log(c, d, sent.id)
+                await after_send(content_cache.store(c, i, m, cv, copied, log_id=sent.id))
+                if p: await after_send(c.delete_messages(d, p.id))
                 
                 return 'Done (Large file).'
             
-            await c.edit_message_text(d, p.id, 'Uploading...')
+            file_ext = os.path.splitext(f)[1].lower()
+            is_video = m.video or (m.document and file_ext in video_extensions)
+            if is_video:
+                # probe before waiting for our turn so it overlaps the previous upload
+                mtd = await get_video_metadata(f)
+                dur, h, w = mtd['duration'], mtd['width'], mtd['height']
+                th = await screenshot(f, dur, d)
+
+            if gate: await gate()
+            await say('Uploading...')
             st = time.time()
 
-            try:
-                video_extensions = ['.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm', '.m4v', '.3gp', '.ogv']
-                audio_extensions = ['.mp3', '.wav', '.flac', '.aac', '.ogg', '.wma', '.m4a', '.opus', '.aiff', '.ac3']
-                file_ext = os.path.splitext(f)[1].lower()
-                if m.video or (m.document and file_ext in video_extensions):
-                    mtd = await get_video_metadata(f)
-                    dur, h, w = mtd['duration'], mtd['width'], mtd['height']
-                    th = await screenshot(f, dur, d)
-                    await c.send_video(tcid, video=f, caption=ft if m.caption else None, 
-                                    thumb=th, width=w, height=h, duration=dur, 
-                                    progress=prog, progress_args=(c, d, p.id, st), 
-                                    reply_to_message_id=rtmid)
-                elif m.video_note:
-                    await c.send_video_note(tcid, video_note=f, progress=prog, 
-                                        progress_args=(c, d, p.id, st), reply_to_message_id=rtmid)
-                elif m.voice:
-                    await c.send_voice(tcid, f, progress=prog, progress_args=(c, d, p.id, st), 
-                                    reply_to_message_id=rtmid)
-                elif m.sticker:
-                    await c.send_sticker(tcid, m.sticker.file_id, reply_to_message_id=rtmid)
-                elif m.audio or (m.document and file_ext in audio_extensions):
-                    await c.send_audio(tcid, audio=f, caption=ft if m.caption else None, 
-                                    thumb=th, progress=prog, progress_args=(c, d, p.id, st), 
-                                    reply_to_message_id=rtmid)
-                elif m.photo:
-                    await c.send_photo(tcid, photo=f, caption=ft if m.caption else None, 
-                                    progress=prog, progress_args=(c, d, p.id, st), 
-                                    reply_to_message_id=rtmid)
-                elif m.document:
-                    await c.send_document(tcid, document=f, caption=ft if m.caption else None, 
-                                        progress=prog, progress_args=(c, d, p.id, st), 
+            kind = ('video' if is_video else 'audio' if m.audio or (m.document and file_ext in audio_extensions)
+                    else 'document' if m.document else None)
+            while True:
+                try:
+                    sent = await upload_fast(c, tcid, f, kind, opts, caption=ft if m.caption else None,
+                                             thumb=th if kind != 'document' else None,
+                                             **(dict(duration=dur, width=w, height=h) if is_video else {}),
+                                             reply_to_message_id=rtmid, **track())
+
+                    if sent:
+                        pass
+                    elif is_video:
+                        sent = await c.send_video(tcid, video=f, caption=ft if m.caption else None, 
+                                        thumb=th, width=w, height=h, duration=dur, 
+                                        **track(), 
                                         reply_to_message_id=rtmid)
-                else:
-                    await c.send_document(tcid, document=f, caption=ft if m.caption else None, 
-                                        progress=prog, progress_args=(c, d, p.id, st), 
+                    elif m.video_note:
+                        sent = await c.send_video_note(tcid, video_note=f, **track(), reply_to_message_id=rtmid)
+                    elif m.voice:
+                        sent = await c.send_voice(tcid, f, **track(), 
                                         reply_to_message_id=rtmid)
-            except Exception as e:
-                await c.edit_message_text(d, p.id, f'Upload failed: {str(e)[:30]}')
-                if os.path.exists(f): os.remove(f)
-                return 'Failed.'
+                    elif m.sticker:
+                        sent = await c.send_sticker(tcid, m.sticker.file_id, reply_to_message_id=rtmid)
+                    elif m.audio or (m.document and file_ext in audio_extensions):
+                        sent = await c.send_audio(tcid, audio=f, caption=ft if m.caption else None, 
+                                        thumb=th, **track(), 
+                                        reply_to_message_id=rtmid)
+                    elif m.photo:
+                        sent = await c.send_photo(tcid, photo=f, caption=ft if m.caption else None, 
+                                        **track(), 
+                                        reply_to_message_id=rtmid)
+                    elif m.document:
+                        sent = await c.send_document(tcid, document=f, caption=ft if m.caption else None, 
+                                            **track(), 
+                                            reply_to_message_id=rtmid)
+                    else:
+                        sent = await c.send_document(tcid, document=f, caption=ft if m.caption else None, 
+                                            **track(), 
+                                            reply_to_message_id=rtmid)
+                    break
+                except RETRY_AFTER as e:
+                    await wait_flood(c, uid, e)
+                except Exception as e:
+                    if p: await progress.done(d, p.id)
+                    await say(f'Upload failed: {str(e)[:30]}')
+                    return 'Failed.'
             
-            os.remove(f)
-            await c.delete_messages(d, p.id)
+            if p: await after_send(c.delete_messages(d, p.id))
+            await after_send(content_cache.store(c, i, m, cv, sent))
             
             return 'Done.'
             
         elif m.text:
+            if gate: await gate()
             await c.send_message(tcid, text=m.text.markdown, reply_to_message_id=rtmid)
             return 'Sent.'
+    except RETRY_AFTER:
+        raise
+    except BatchHalted:
+        if p:
+            try: await c.delete_messages(d, p.id)
+            except Exception: pass
+        raise
     except Exception as e:
         return f'Error: {str(e)[:50]}'
+    finally:
+        if p: await progress.done(d, p.id)
+        if f:
+            thumbs.release(f)
+            if os.path.exists(f): os.remove(f)
+        if held: await budget.release(held)
         
+def parse_batch_args(args):
+    """'<count> [workers] [fast|normal] [dashboard|items] [relay|disk]' -> (count, workers, per-job options)."""
+    count, workers, opts = int(args[0]), BATCH_WORKERS, {'dl': DOWNLOAD_ENGINE, 'ul': UPLOAD_ENGINE, 'ui': BATCH_UI, 'io': TRANSFER_MODE}
+    for a in args[1:]:
+        a = a.lower()
+        if a.isdigit():
+            workers = int(a)
+        elif a == 'fast':
+            opts['dl'] = opts['ul'] = 'parallel'
+        elif a == 'normal':
+            opts['dl'] = opts['ul'] = 'default'
+        elif a in ('dashboard', 'items'):
+            opts['ui'] = a
+        elif a in ('relay', 'disk'):
+            opts['io'] = a
+    return count, max(1, min(workers, MAX_BATCH_WORKERS)), opts
+
+async def run_batch(c, u, i, s, n, lt, d, uid, pt, workers, start=0, success=0, opts=None):
+    """Runs ids s+start..s+n-1 on `workers` workers, sending in id order; returns (committed, successes)."""
+    buf = ReorderBuffer(start, success)
+    budget = ByteBudget(PREFETCH_DISK_MB * 1024 * 1024, buf)
+    pf = MessagePrefetcher(c, u, i, s, n, lt, start)
+    pacer = pacer_for(c)
+    state = {'next': start, 'shown': 0}
+    dash = BatchDashboard(uid, pt, pacer) if (opts or {}).get('ui', BATCH_UI) == 'dashboard' else None
+
+    async def worker():
+        while not should_stop(uid) and state['next'] < n:
+            j = state['next']
+            state['next'] += 1
+            mid = int(s) + j
+            await buf.admit(j, PIPELINE_DEPTH)
+            ok, res, handled = False, None, False
+            try:
+                msg = await pf.get(mid)
+                while not should_stop(uid):
+                    if msg:
+                        await pacer.wait()
+                        try:
+                            res = await process_msg(c, u, msg, d, lt, uid, i, gate=lambda: buf.wait(j), budget=budget,
+                                                    opts=opts, dash=dash, idx=j)
+                        except RETRY_AFTER as e:
+                            pacer.flood(e.value)
+                            continue
+                        ok = bool(res and ('Done' in res or 'Copied' in res or 'Sent' in res))
+                        if ok: pacer.success()
+                    handled = True
+                    break
+            except BatchHalted:
+                pass
+            except Exception as e:
+                handled = True
+                res = f'Error - {str(e)[:30]}'
+                if not dash:
+                    progress.update(pt.chat.id, pt.id, pt.edit, f'{j+1}/{n}: {res}')
+            finally:
+                if handled:
+                    await buf.release(j, ok)
+                    await update_batch_progress(uid, buf.next, buf.success, int(s) + buf.next - 1)
+                else:
+                    # a stop came before it ran (or it could not send in order): /resume redoes it
+                    await buf.halt(j)
+                if dash: dash.finish(mid, res, ok)
+            if not dash and time.time() - state['shown'] > 10:
+                state['shown'] = time.time()
+                progress.update(pt.chat.id, pt.id, pt.edit,
+                                f'Processing {buf.next}/{n} · Success: {buf.success} · Pace: {pacer.describe()}')
+
+    if dash: dash.start()
+    try:
+        await asyncio.gather(*(worker() for _ in range(min(workers, n - start) or 1)))
+    finally:
+        pf.close()
+        if dash: await dash.stop()
+        else: await progress.done(pt.chat.id, pt.id)  # so a late edit cannot overwrite the final status
+    return buf.next, buf.success
+
+async def drive_batch(uid, c, u, pt):
+    """Runs the batch checkpointed in ACTIVE_USERS for uid from its last committed item."""
+    info = get_batch_info(uid)
+    if not info:
+        return
+    n = info['total']
+    RUNNING[uid] = asyncio.current_task()
+    UB.ref(uid)
+    UC.ref(uid)
+    paused = False
+    try:
+        done, success = await run_batch(c, u, info['cid'], info['sid'], n, info['lt'], info['did'], uid, pt,
+                                        info.get('workers', BATCH_WORKERS), info.get('current', 0), info.get('success', 0),
+                                        info.get('opts'))
+        if should_cancel(uid):
+            await pt.edit(f'Cancelled at {done}/{n}. Success: {success}')
+        elif info.get('pause_requested'):
+            paused = True
+            await set_batch_fields(uid, {'paused': True, 'pause_requested': False})
+            await pt.edit(f'Paused at {done}/{n}. Success: {success}. Send /resume to continue.')
+        else:
+            await pt.reply_text(f'Batch Completed ✅ Success: {success}/{n}')
+    finally:
+        RUNNING.pop(uid, None)
+        UB.unref(uid)
+        UC.unref(uid)
+        if not paused:
+            await remove_active_batch(uid)
+
+async def resume_batch(uid):
+    info = get_batch_info(uid)
+    try:
+        ubot = await get_ubot(uid)
+        uc = await get_uclient(uid)
+        if not ubot or not uc:
+            raise RuntimeError('missing client setup')
+        pt = await X.send_message(int(info['did']), f"Resuming batch from {info.get('current', 0)}/{info['total']}...")
+    except Exception as e:
+        print(f'Could not resume batch for user {uid}: {e}')
+        return
+    await drive_batch(uid, ubot, uc, pt)
+
 @X.on_message(filters.command(['batch', 'single']))
 async def process_cmd(c, m):
     uid = m.from_user.id
@@ -416,7 +894,10 @@ async def process_cmd(c, m):
 @X.on_message(filters.command(['cancel', 'stop']))
 async def cancel_cmd(c, m):
     uid = m.from_user.id
-    if is_user_active(uid):
+    if is_user_active(uid) and uid not in RUNNING:
+        await remove_active_batch(uid)
+        await m.reply_text('Paused batch discarded.')
+    elif is_user_active(uid):
         if await request_batch_cancel(uid):
             await m.reply_text('Cancellation requested. The current batch will stop after the current download completes.')
         else:
@@ -424,8 +905,26 @@ async def cancel_cmd(c, m):
     else:
         await m.reply_text('No active batch process found.')
 
+@X.on_message(filters.command('pause'))
+async def pause_cmd(c, m):
+    uid = m.from_user.id
+    if uid in RUNNING and await request_batch_pause(uid):
+        await m.reply_text('Pause requested. The batch will stop once the items in flight are uploaded.')
+    else:
+        await m.reply_text('No running batch found.')
+
+@X.on_message(filters.command('resume'))
+async def resume_cmd(c, m):
+    uid = m.from_user.id
+    info = get_batch_info(uid)
+    if not info or uid in RUNNING:
+        await m.reply_text('No paused batch found.')
+        return
+    await set_batch_fields(uid, {'paused': False})
+    await resume_batch(uid)
+
 @X.on_message(filters.text & filters.private & ~login_in_progress & ~filters.command([
-    'start', 'batch', 'cancel', 'login', 'logout', 'stop', 'set', 
+    'start', 'batch', 'cancel', 'login', 'logout', 'stop', 'set', 'pause', 'resume',
     'pay', 'redeem', 'gencode', 'single', 'generate', 'keyinfo', 'encrypt', 'decrypt', 'keys', 'setbot', 'rembot']))
 async def text_handler(c, m):
     uid = m.from_user.id
@@ -444,7 +943,7 @@ async def text_handler(c, m):
             Z.pop(uid, None)
             return
         Z[uid].update({'step': 'count', 'cid': i, 'sid': d, 'lt': lt})
-        await m.reply_text('How many messages?')
+        await m.reply_text(f'How many messages? (optionally followed by workers, `fast` for parallel transfers and `items` for per-file status, `relay` to skip the disk, e.g. `100 {BATCH_WORKERS} fast`)')
 
     elif s == 'start_single':
         L = m.text
@@ -475,6 +974,8 @@ async def text_handler(c, m):
             Z.pop(uid, None)
             return
 
+        UB.ref(uid)
+        UC.ref(uid)
         try:
             msg = await get_msg(ubot, uc, i, s, lt)
             if msg:
@@ -485,14 +986,17 @@ async def text_handler(c, m):
         except Exception as e:
             await pt.edit(f'Error: {str(e)[:50]}')
         finally:
+            UB.unref(uid)
+            UC.unref(uid)
             Z.pop(uid, None)
 
     elif s == 'count':
-        if not m.text.isdigit():
+        args = m.text.split()
+        if not args or not args[0].isdigit():
             await m.reply_text('Enter valid number.')
             return
         
-        count = int(m.text)
+        count, workers, opts = parse_batch_args(args)
         maxlimit = PREMIUM_LIMIT if await is_premium_user(uid) else FREEMIUM_LIMIT
 
         if count > maxlimit:
@@ -501,7 +1005,6 @@ async def text_handler(c, m):
 
         Z[uid].update({'step': 'process', 'did': str(m.chat.id), 'num': count})
         i, s, n, lt = Z[uid]['cid'], Z[uid]['sid'], Z[uid]['num'], Z[uid]['lt']
-        success = 0
 
         pt = await m.reply_text('Processing batch...')
         uc = await get_uclient(uid)
@@ -518,43 +1021,32 @@ async def text_handler(c, m):
             return
         
         await add_active_batch(uid, {
+            "cid": i,
+            "sid": s,
+            "lt": lt,
+            "did": str(m.chat.id),
             "total": n,
             "current": 0,
             "success": 0,
+            "workers": workers,
+            "opts": opts,
             "cancel_requested": False,
             "progress_message_id": pt.id
             })
         
         try:
-            for j in range(n):
-                
-                if should_cancel(uid):
-                    await pt.edit(f'Cancelled at {j}/{n}. Success: {success}')
-                    break
-                
-                await update_batch_progress(uid, j, success)
-                
-                mid = int(s) + j
-                
-                try:
-                    msg = await get_msg(ubot, uc, i, mid, lt)
-                    if msg:
-                        res = await process_msg(ubot, uc, msg, str(m.chat.id), lt, uid, i)
-                        if 'Done' in res or 'Copied' in res or 'Sent' in res:
-                            success += 1
-                    else:
-                        pass
-                except Exception as e:
-                    try: await pt.edit(f'{j+1}/{n}: Error - {str(e)[:30]}')
-                    except: pass
-                
-                await asyncio.sleep(10)
-            
-            if j+1 == n:
-                await m.reply_text(f'Batch Completed ✅ Success: {success}/{n}')
-        
+            await drive_batch(uid, ubot, uc, pt)
         finally:
-            await remove_active_batch(uid)
             Z.pop(uid, None)
 
-
+async def run_batch_plugin():
+    asyncio.create_task(UB.run_evictor())
+    asyncio.create_task(UC.run_evictor())
+    for key, info in list(ACTIVE_USERS.items()):
+        if 'cid' not in info or info.get('cancel_requested'):
+            # nothing to resume from (or the user already gave up on it)
+            await remove_active_batch(key)
+        elif info.get('pause_requested') or info.get('paused'):
+            await set_batch_fields(key, {'paused': True, 'pause_requested': False})
+        else:
+            asyncio.create_task(resume_batch(int(key)))
@@ -41,9 +41,7 @@ async def set_bot_token(C, m):
     args = m.text.split(" ", 1)
     if user_id in UB:
         try:
-            await UB[user_id].stop()
-            if UB.get(user_id, None):
-                del UB[user_id]  # Remove from dictionary
+            await UB.drop(user_id)
                 
             try:
                 if os.path.exists(f"user_{user_id}.session"):
@@ -54,7 +52,6 @@ async def set_bot_token(C, m):
             print(f"Stopped and removed old bot for user {user_id}")
         except Exception as e:
             print(f"Error stopping old bot for user {user_id}: {e}")
-            del UB[user_id]  # Remove from dictionary
 
     if len(args) < 2:
         await m.reply_text("⚠️ Please provide a bot token. Usage: `/setbto token`", quote=True)
@@ -70,10 +67,7 @@ async def rem_bot_token(C, m):
     user_id = m.from_user.id
     if user_id in UB:
         try:
-            await UB[user_id].stop()
-            
-            if UB.get(user_id, None):
-                del UB[user_id]  # Remove from dictionary # Remove from dictionary
+            await UB.drop(user_id)
             print(f"Stopped and removed old bot for user {user_id}")
             try:
                 if os.path.exists(f"user_{user_id}.session"):
@@ -82,8 +76,6 @@ async def rem_bot_token(C, m):
                 pass
         except Exception as e:
             print(f"Error stopping old bot for user {user_id}: {e}")
-            if UB.get(user_id, None):
-                del UB[user_id]  # Remove from dictionary  # Remove from dictionary
             try:
                 if os.path.exists(f"user_{user_id}.session"):
                     os.remove(f"user_{user_id}.session")
@@ -266,16 +258,14 @@ Still removing from database..."""
                 os.remove(f"{user_id}_client.session")
         except Exception:
             pass
-        if UC.get(user_id, None):
-            del UC[user_id]
+        await UC.drop(user_id)
     except Exception as e:
         logger.error(f'Error in logout command: {str(e)}')
         try:
             await remove_user_session(user_id)
         except Exception:
             pass
-        if UC.get(user_id, None):
-            del UC[user_id]
+        await UC.drop(user_id)
         await edit_message_safely(status_msg,
             f'❌ An error occurred during logout: {str(e)}')
         try:
@@ -38,6 +38,7 @@ async def set(_, message):
         BotCommand("logout", "🚪 Get out of the bot"),
         BotCommand("adl", "👻 Download audio from 30+ sites"),
         BotCommand("dl", "💀 Download videos from 30+ sites"),
+        BotCommand("ytcancel", "🛑 Cancel your /dl or /adl download"),
         BotCommand("status", "⟳ Refresh Payment status"),
         BotCommand("transfer", "💘 Gift premium to others"),
         BotCommand("add", "➕ Add user to premium"),
@@ -48,7 +49,9 @@ async def set(_, message):
         BotCommand("terms", "🥺 Terms and conditions"),
         BotCommand("help", "❓ If you're a noob, still!"),
         BotCommand("cancel", "🚫 Cancel login/batch/settings process"),
-        BotCommand("stop", "🚫 Cancel batch process")
+        BotCommand("stop", "🚫 Cancel batch process"),
+        BotCommand("pause", "⏸️ Pause batch process"),
+        BotCommand("resume", "▶️ Resume paused batch")
     ])
  
     await message.reply("✅ Commands configured successfully!")
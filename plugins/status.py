@@ -1,6 +1,9 @@
 # plugins/status.py
 from shared_client import app, userbot, client as tclient
 from pyrogram import filters
+from config import OWNER_ID
+from plugins.batch import UB, UC
+from utils import content_cache, ratelimit, ytcache
 import asyncio
 
 
@@ -33,10 +36,13 @@ async def status_handler(_, message):
     except:
         tele_ok = "❌"
 
-    await message.reply(
+    text = (
         f"📡 **SRCV3 Client Status**\n\n"
         f"🤖 Pyrogram Bot: {bot_ok}\n"
         f"👤 Userbot (Pyrogram): {pyro_ok}\n"
-        f"🕵️ Telethon Client: {tele_ok}",
-        quote=True
+        f"🕵️ Telethon Client: {tele_ok}"
     )
+    if message.from_user and message.from_user.id in OWNER_ID:
+        text += f"\n\n🧰 Client pools:\n{UB.summary()}\n{UC.summary()}\n{content_cache.summary()}\n{ytcache.summary()}\n{ratelimit.summary()}"
+
+    await message.reply(text, quote=True)
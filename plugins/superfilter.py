@@ -8,84 +8,116 @@ import asyncio
 from shared_client import app, userbot
 from pyrogram import filters
 from pyrogram.types import Message
-from utils.func import get_user_data_key, save_user_data
+from utils.func import get_user_data_key, get_user_data, save_user_data
 
 TASK_LOCK = asyncio.Lock()
 
 
-async def apply_rules(text: str, uid: int):
-    if text is None:
-        return text
+class _AffixTrie:
+    """Finds which of a set of prefixes (or, built reversed, suffixes) a line starts with.
 
-    replaces = await get_user_data_key(uid, "super_replace", {}) or {}
-    removes  = await get_user_data_key(uid, "super_remove", []) or []
-    regexes  = await get_user_data_key(uid, "super_regex", []) or []
-    cases    = await get_user_data_key(uid, "super_case", {}) or {}
-    begins   = await get_user_data_key(uid, "super_begin", {}) or {}
-    ends     = await get_user_data_key(uid, "super_end", {}) or {}
+    When several keys match, the one added first wins, like the old first-match loop.
+    """
 
-    out = str(text)
+    def __init__(self, rules, reverse=False):
+        self.root = {}
+        self.reverse = reverse
+        for order, (key, value) in enumerate(rules.items()):
+            if not key:
+                continue
+            node = self.root
+            for ch in (reversed(key) if reverse else key):
+                node = node.setdefault(ch, {})
+            node.setdefault(None, (order, key, value))
+
+    def match(self, line):
+        node, best = self.root, None
+        for ch in (reversed(line) if self.reverse else line):
+            node = node.get(ch)
+            if node is None:
+                break
+            hit = node.get(None)
+            if hit and (best is None or hit[0] < best[0]):
+                best = hit
+        return best
+
+
+class SuperProgram:
+    """A user's superfilters compiled once, then applied exactly like the rules were added.
+
+    Every rule keeps its own precompiled pattern and runs in insertion order on the previous
+    rule's output, so chained rules (cat -> dog, dog -> wolf) behave as before.
+    """
 
-    # literal replace
-    for old, new in replaces.items():
-        if old:
+    def __init__(self, doc: dict):
+        self.replaces = [(k, v) for k, v in (doc.get("super_replace") or {}).items() if k]
+        self.cases = [(re.compile(re.escape(k), re.IGNORECASE), k, v)
+                      for k, v in (doc.get("super_case") or {}).items() if k]
+        self.regexes = []
+        for entry in doc.get("super_regex") or []:
+            try:
+                if entry.get("pattern"):
+                    self.regexes.append((re.compile(entry["pattern"]), entry.get("replace", "")))
+            except Exception:
+                pass
+        removes = doc.get("super_remove") or []
+        self.remove_re = re.compile("|".join(re.escape(r) for r in removes)) if removes else None
+        begins, ends = doc.get("super_begin") or {}, doc.get("super_end") or {}
+        self.begins = _AffixTrie(begins) if begins else None
+        self.ends = _AffixTrie(ends, reverse=True) if ends else None
+
+    def _begin(self, line):
+        hit = self.begins.match(line)
+        return hit[2] + line[len(hit[1]):] if hit else line
+
+    def _end(self, line):
+        hit = self.ends.match(line)
+        return line[:-len(hit[1])] + hit[2] if hit else line
+
+    def run(self, text: str) -> str:
+        out = str(text)
+        for old, new in self.replaces:
             out = out.replace(old, new)
-
-    # case-insensitive
-    for old, new in cases.items():
-        if old:
+        for pattern, old, new in self.cases:
             try:
-                out = re.sub(re.escape(old), new, out, flags=re.IGNORECASE)
+                out = pattern.sub(new, out)
             except Exception:
                 out = out.replace(old, new)
+        for pattern, rep in self.regexes:
+            try:
+                out = pattern.sub(rep, out)
+            except Exception:
+                pass
+        # remove lines containing tokens
+        if self.remove_re:
+            out = "\n".join(l for l in out.splitlines() if not self.remove_re.search(l))
+        # begin and end replacements stay separate passes: a replacement may itself add lines
+        if self.begins:
+            out = "\n".join(self._begin(l) for l in out.splitlines())
+        if self.ends:
+            out = "\n".join(self._end(l) for l in out.splitlines())
+        return out
 
-    # regex entries
-    for entry in regexes:
-        try:
-            pat = entry.get("pattern")
-            rep = entry.get("replace", "")
-            if pat:
-                out = re.sub(pat, rep, out)
-        except Exception:
-            pass
 
-    # remove lines containing tokens
-    if removes:
-        lines = out.splitlines()
-        lines = [l for l in lines if not any(rem in l for rem in removes)]
-        out = "\n".join(lines)
+# uid -> SuperProgram; dropped by every handler that changes the user's superfilters
+_programs = {}
 
-    # begin replacements
-    if begins:
-        lines = out.splitlines()
-        newl = []
-        for l in lines:
-            replaced = False
-            for k, v in begins.items():
-                if k and l.startswith(k):
-                    newl.append(v + l[len(k):])
-                    replaced = True
-                    break
-            if not replaced:
-                newl.append(l)
-        out = "\n".join(newl)
-
-    # end replacements
-    if ends:
-        lines = out.splitlines()
-        newl = []
-        for l in lines:
-            replaced = False
-            for k, v in ends.items():
-                if k and l.endswith(k):
-                    newl.append(l[:-len(k)] + v)
-                    replaced = True
-                    break
-            if not replaced:
-                newl.append(l)
-        out = "\n".join(newl)
-
-    return out
+
+def invalidate_program(uid: int):
+    _programs.pop(uid, None)
+
+
+async def get_program(uid: int) -> SuperProgram:
+    program = _programs.get(uid)
+    if program is None:
+        program = _programs[uid] = SuperProgram(await get_user_data(uid) or {})
+    return program
+
+
+async def apply_rules(text: str, uid: int):
+    if text is None:
+        return text
+    return (await get_program(uid)).run(text)
 
 
 def _parse_edit_link(link: str):
@@ -196,6 +228,7 @@ async def add_super_replace(client, message: Message):
     data = await get_user_data_key(uid, "super_replace", {}) or {}
     data[old] = new
     await save_user_data(uid, "super_replace", data)
+    invalidate_program(uid)
     await message.reply(f"✅ Replace added: `{old}` → `{new}`", quote=True)
 
 
@@ -209,6 +242,7 @@ async def add_super_case(client, message: Message):
     data = await get_user_data_key(uid, "super_case", {}) or {}
     data[old] = new
     await save_user_data(uid, "super_case", data)
+    invalidate_program(uid)
     await message.reply(f"✅ Case-insensitive replace added: `{old}` → `{new}`", quote=True)
 
 
@@ -222,6 +256,7 @@ async def add_super_remove(client, message: Message):
     if text not in data:
         data.append(text)
     await save_user_data(uid, "super_remove", data)
+    invalidate_program(uid)
     await message.reply(f"🗑 Rule added: `{text}`", quote=True)
 
 
@@ -235,6 +270,7 @@ async def add_super_regex(client, message: Message):
     data = await get_user_data_key(uid, "super_regex", []) or []
     data.append({"pattern": pattern, "replace": rep})
     await save_user_data(uid, "super_regex", data)
+    invalidate_program(uid)
     await message.reply(f"🔍 Regex rule added: `{pattern}` → `{rep}`", quote=True)
 
 
@@ -248,6 +284,7 @@ async def add_super_begin(client, message: Message):
     data = await get_user_data_key(uid, "super_begin", {}) or {}
     data[prefix] = rep
     await save_user_data(uid, "super_begin", data)
+    invalidate_program(uid)
     await message.reply(f"⏩ Begin-with rule added: `{prefix}` → `{rep}`", quote=True)
 
 
@@ -261,6 +298,7 @@ async def add_super_end(client, message: Message):
     data = await get_user_data_key(uid, "super_end", {}) or {}
     data[suffix] = rep
     await save_user_data(uid, "super_end", data)
+    invalidate_program(uid)
     await message.reply(f"⏪ End-with rule added: `{suffix}` → `{rep}`", quote=True)
 
 
@@ -273,6 +311,7 @@ async def clear_super_filters(client, message: Message):
     await save_user_data(uid, "super_case", {})
     await save_user_data(uid, "super_begin", {})
     await save_user_data(uid, "super_end", {})
+    invalidate_program(uid)
     await message.reply("♻️ All superfilters cleared!", quote=True)
 
 
@@ -361,8 +400,7 @@ async def superfilter_edit_range(client: app.__class__, message: Message):
                     edited_ok = False
 
                 if edited_ok:
-                    edited += 1
-                    await asyncio.sleep(0.45)
+                    edited += 1  # edits are paced by the account's rate limiter
                 else:
                     failed += 1
 
@@ -12,7 +12,6 @@
 # License: MIT License
 # ---------------------------------------------------
 
-import yt_dlp
 import os
 import tempfile
 import time
@@ -30,19 +29,18 @@ from telethon.tl.types import DocumentAttributeVideo
 from utils.func import get_video_metadata, screenshot
 from telethon.tl.functions.messages import EditMessageRequest
 from devgagantools import fast_upload
-from concurrent.futures import ThreadPoolExecutor
 import aiohttp 
 import logging
 import aiofiles
-from config import YT_COOKIES, INSTA_COOKIES
+from config import YT_COOKIES, INSTA_COOKIES, YTDL_MAX_MB, YTDL_MAX_HEIGHT
+from utils import progress, thumbs, ytjobs, ytcache, ytopts
 from mutagen.id3 import ID3, TIT2, TPE1, COMM, APIC
 from mutagen.mp3 import MP3
  
 logger = logging.getLogger(__name__)
  
  
-thread_pool = ThreadPoolExecutor()
-ongoing_downloads = {}
+ongoing_downloads = {}  # user id -> True, or the YtJob running for them
  
 def d_thumbnail(thumbnail_url, save_path):
     try:
@@ -65,11 +63,54 @@ async def download_thumbnail_async(url, path):
                     f.write(await response.read())
  
  
-async def extract_audio_async(ydl_opts, url):
-    def sync_extract():
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            return ydl.extract_info(url, download=True)
-    return await asyncio.get_event_loop().run_in_executor(thread_pool, sync_extract)
+async def run_job(user_id, url, ydl_opts, status, download=True, limits=None, key=None):
+    """Run yt-dlp in a worker process, showing its download progress on `status`; /ytcancel kills it.
+
+    With a cache `key`, recently extracted info for the same link is reused instead of
+    extracting again, and fresh extractions are stored for the next request.
+    """
+    job = ytjobs.YtJob(url, ydl_opts, download, limits, ytcache.info(key) if key else None)
+    ongoing_downloads[user_id] = job
+    strategy = ytopts.describe(ydl_opts)
+
+    def on_progress(d):
+        if d.get('status') != 'downloading':
+            return
+        done = d.get('downloaded_bytes') or 0
+        total = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
+        percent = done * 100 / total if total else 0
+        bar = "♦" * int(percent // 10) + "◇" * (10 - int(percent // 10))
+        text = (
+            f"**__Downloading...__**\n\n{bar} {percent:.1f}%\n"
+            f"**__Done:__** {humanbytes(done) or '0 B'} / {humanbytes(total) or '?'}\n"
+            f"**__Speed:__** {humanbytes(d.get('speed')) or '-'}/s | **__ETA:__** {convert(int(d.get('eta') or 0))}\n"
+            f"**__Via:__** {strategy}\n\n"
+            f"__/ytcancel to stop__"
+        )
+        progress.update(status.chat_id, status.id, status.edit, text)
+
+    try:
+        return await job.run(on_progress)
+    finally:
+        if key and job.info:
+            ytcache.store_info(key, job.info)
+        ongoing_downloads[user_id] = True
+        await progress.done(status.chat_id, status.id)
+ 
+ 
+async def send_cached(event, key):
+    """Resend an earlier upload of the same link and options; True when that worked."""
+    hit = ytcache.media(key)
+    if not hit:
+        return False
+    media, caption = hit
+    try:
+        await client.send_file(event.chat_id, media, caption=caption)
+        return True
+    except Exception as e:
+        logger.warning(f"Cached resend failed, downloading again: {e}")
+        ytcache.forget_media(key)
+        return False
  
  
 def get_random_string(length=7):
@@ -99,14 +140,19 @@ async def process_audio(client, event, url, cookies_env_var=None):
         'postprocessors': [{'key': 'FFmpegExtractAudio', 'preferredcodec': 'mp3', 'preferredquality': '192'}],
         'quiet': False,
         'noplaylist': True,
+        **ytopts.downloader(url),
     }
     prog = None
+    key = ytcache.key(url, ydl_opts)
  
     progress_message = await event.reply("**__Starting audio extraction...__**")
  
     try:
-         
-        info_dict = await extract_audio_async(ydl_opts, url)
+        if await send_cached(event, key):
+            await progress_message.delete()
+            return
+ 
+        info_dict = await run_job(event.sender_id, url, ydl_opts, progress_message, key=key)
         title = info_dict.get('title', 'Extracted Audio')
  
         await progress_message.edit("**__Editing metadata...__**")
@@ -143,18 +189,27 @@ async def process_audio(client, event, url, cookies_env_var=None):
         if os.path.exists(download_path):
             await progress_message.delete()
             prog = await client.send_message(chat_id, "**__Starting Upload...__**")
-            uploaded = await fast_upload(
-                client, download_path, 
-                reply=prog, 
-                name=None,
-                progress_bar_function=lambda done, total: progress_callback(done, total, chat_id)
-            )
-            await client.send_file(chat_id, uploaded, caption=f"**{title}**\n\n**__Powered by Team SPY__**")
+            sink = progress.Sink(prog)
+            try:
+                uploaded = await fast_upload(
+                    client, download_path, 
+                    reply=sink, 
+                    name=None,
+                    progress_bar_function=lambda done, total: progress_callback(done, total, chat_id)
+                )
+            finally:
+                await sink.done()
+                user_progress.pop(chat_id, None)
+            caption = f"**{title}**\n\n**__Powered by Team SPY__**"
+            sent = await client.send_file(chat_id, uploaded, caption=caption)
+            ytcache.store_media(key, sent, caption)
             if prog:
                 await prog.delete()
         else:
             await event.reply("**__Audio file not found after extraction!__**")
  
+    except ytjobs.JobCancelled:
+        await progress_message.edit("**__Download cancelled.__**")
     except Exception as e:
         logger.exception("Error during audio extraction or upload")
         await event.reply(f"**__An error occurred: {e}__**")
@@ -191,28 +246,11 @@ async def handler(event):
         ongoing_downloads.pop(user_id, None)
  
  
-async def fetch_video_info(url, ydl_opts, progress_message, check_duration_and_size):
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info_dict = ydl.extract_info(url, download=False)
- 
-        if check_duration_and_size:
-             
-            duration = info_dict.get('duration', 0)
-            if duration and duration > 3 * 3600:   
-                await progress_message.edit("**❌ __Video is longer than 3 hours. Download aborted...__**")
-                return None
- 
-             
-            estimated_size = info_dict.get('filesize_approx', 0)
-            if estimated_size and estimated_size > 2 * 1024 * 1024 * 1024:   
-                await progress_message.edit("**🤞 __Video size is larger than 2GB. Aborting download.__**")
-                return None
- 
-        return info_dict
- 
-def download_video(url, ydl_opts):
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        ydl.download([url])
+MAX_BYTES = YTDL_MAX_MB * 1024 * 1024
+REJECTED = {
+    'duration': "**❌ __Video is longer than 3 hours. Download aborted...__**",
+    'size': f"**🤞 __No format of this video fits in {YTDL_MAX_MB} MB. Aborting download.__**",
+}
  
  
 @client.on(events.NewMessage(pattern="/dl"))
@@ -229,8 +267,8 @@ async def handler(event):
         return    
  
     url = event.message.text.split()[1]
+    ongoing_downloads[user_id] = True
  
-     
     try:
         if "instagram.com" in url:
             await process_video(client, event, url, "INSTA_COOKIES", check_duration_and_size=False)
@@ -246,6 +284,14 @@ async def handler(event):
         ongoing_downloads.pop(user_id, None)
  
  
+@client.on(events.NewMessage(pattern="/ytcancel"))
+async def cancel_handler(event):
+    job = ongoing_downloads.get(event.sender_id)
+    if isinstance(job, ytjobs.YtJob):
+        job.cancel()
+        await event.reply("**__Cancelling your download...__**")
+    else:
+        await event.reply("**__Nothing to cancel right now.__**")
  
  
 user_progress = {}
@@ -340,20 +386,25 @@ async def process_video(client, event, url, cookies_env_var, check_duration_and_
      
     ydl_opts = {
         'outtmpl': download_path,
-        'format': 'best',
+        'format': ytopts.FormatBudget(MAX_BYTES, YTDL_MAX_HEIGHT),
+        'merge_output_format': 'mp4',  # the selector only pairs mp4-compatible streams, so this is a stream copy
         'cookiefile': temp_cookie_path if temp_cookie_path else None,
         'writethumbnail': True,
         'verbose': True,
+        **ytopts.downloader(url),
     }
     prog = None
+    key = ytcache.key(url, ydl_opts)
     progress_message = await event.reply("**__Starting download...__**")
     logger.info("Starting the download process...")
     try:
-        info_dict = await fetch_video_info(url, ydl_opts, progress_message, check_duration_and_size)
-        if not info_dict:
+        if await send_cached(event, key):
+            await progress_message.delete()
             return
-         
-        await asyncio.to_thread(download_video, url, ydl_opts)
+        # one extraction: the limits are checked on its info dict, then the same dict is downloaded
+        info_dict = await run_job(event.sender_id, url, ydl_opts, progress_message,
+                                  limits={'size': MAX_BYTES, 'duration': 3 * 3600 if check_duration_and_size else None},
+                                  key=key)
         title = info_dict.get('title', 'Powered by Team SPY')
         k = await get_video_metadata(download_path)      
         W = k['width']
@@ -373,8 +424,8 @@ async def process_video(client, event, url, cookies_env_var, check_duration_and_
                 logger.info(f"Thumbnail saved at: {downloaded_thumb}")
  
         if thumbnail_file:
-            THUMB = thumbnail_file
-        else:
+            THUMB = thumbs.from_file(thumbnail_file)
+        if not THUMB:
             THUMB = await screenshot(download_path, metadata['duration'], event.sender_id)
 
         chat_id = event.chat_id
@@ -389,12 +440,17 @@ async def process_video(client, event, url, cookies_env_var, check_duration_and_
         if os.path.exists(download_path):
             await progress_message.delete()
             prog = await client.send_message(chat_id, "**__Starting Upload...__**")
-            uploaded = await fast_upload(
-                client, download_path,
-                reply=prog,
-                progress_bar_function=lambda done, total: progress_callback(done, total, chat_id)
-            )
-            await client.send_file(
+            sink = progress.Sink(prog)
+            try:
+                uploaded = await fast_upload(
+                    client, download_path,
+                    reply=sink,
+                    progress_bar_function=lambda done, total: progress_callback(done, total, chat_id)
+                )
+            finally:
+                await sink.done()
+                user_progress.pop(chat_id, None)
+            sent = await client.send_file(
                 event.chat_id,
                 uploaded,
                 caption=f"**{title}**",
@@ -408,10 +464,15 @@ async def process_video(client, event, url, cookies_env_var, check_duration_and_
                 ],
                 thumb=THUMB if THUMB else None
             )
+            ytcache.store_media(key, sent, f"**{title}**")
             if prog:
                 await prog.delete()
         else:
             await event.reply("**__File not found after download. Something went wrong!__**")
+    except ytjobs.JobCancelled:
+        await progress_message.edit("**__Download cancelled.__**")
+    except ytjobs.JobRejected as e:
+        await progress_message.edit(REJECTED[e.reason])
     except Exception as e:
         logger.exception("An error occurred during download or upload.")
         await event.reply(f"**__An error occurred: {e}__**")
@@ -423,6 +484,7 @@ async def process_video(client, event, url, cookies_env_var, check_duration_and_
             os.remove(temp_cookie_path)
         if thumbnail_file and os.path.exists(thumbnail_file):
             os.remove(thumbnail_file)
+        thumbs.release(download_path)
  
 
 async def split_and_upload_file(app, sender, file_path, caption):
@@ -452,10 +514,13 @@ async def split_and_upload_file(app, sender, file_path, caption):
             # Uploading part
             edit = await app.send_message(sender, f"⬆️ Uploading part {part_number + 1}...")
             part_caption = f"{caption} \n\n**Part : {part_number + 1}**"
-            await app.send_document(sender, document=part_file, caption=part_caption,
-                progress=progress_bar,
-                progress_args=("╭─────────────────────╮\n│      **__Pyro Uploader__**\n├─────────────────────", edit, time.time())
-            )
+            try:
+                await app.send_document(sender, document=part_file, caption=part_caption,
+                    progress=progress_bar,
+                    progress_args=("╭─────────────────────╮\n│      **__Pyro Uploader__**\n├─────────────────────", edit, time.time())
+                )
+            finally:
+                await progress.done(edit.chat.id, edit.id)
             await edit.delete()
             os.remove(part_file)
 
@@ -501,30 +566,26 @@ async def progress_bar(current: int, total: int, ud_type: str, message, start: f
     now = time.time()
     diff = now - start
     
-    if round(diff % 10) == 0 or current == total:
-        percentage = (current * 100) / total
-        speed = current / diff if diff else 0
-        elapsed_time = round(diff * 1000)
-        time_to_completion = round((total - current) / speed) * 1000 if speed else 0
-        estimated_total_time = elapsed_time + time_to_completion
+    percentage = (current * 100) / total
+    speed = current / diff if diff else 0
+    elapsed_time = round(diff * 1000)
+    time_to_completion = round((total - current) / speed) * 1000 if speed else 0
+    estimated_total_time = elapsed_time + time_to_completion
 
-        elapsed_time_str = TimeFormatter(elapsed_time)
-        estimated_total_time_str = TimeFormatter(estimated_total_time)
+    elapsed_time_str = TimeFormatter(elapsed_time)
+    estimated_total_time_str = TimeFormatter(estimated_total_time)
 
-        progress = "".join(["♦" for _ in range(math.floor(percentage / 10))]) + \
-                   "".join(["◇" for _ in range(10 - math.floor(percentage / 10))])
-        
-        progress_text = progress + PROGRESS_BAR.format(
-            round(percentage, 2),
-            humanbytes(current),
-            humanbytes(total),
-            humanbytes(speed),
-            estimated_total_time_str if estimated_total_time_str else "0 s"
-        )
-        try:
-            await message.edit(text=f"{ud_type}\n│ {progress_text}")
-        except:
-            pass
+    bar = "".join(["♦" for _ in range(math.floor(percentage / 10))]) + \
+          "".join(["◇" for _ in range(10 - math.floor(percentage / 10))])
+    
+    progress_text = bar + PROGRESS_BAR.format(
+        round(percentage, 2),
+        humanbytes(current),
+        humanbytes(total),
+        humanbytes(speed),
+        estimated_total_time_str if estimated_total_time_str else "0 s"
+    )
+    progress.update(message.chat.id, message.id, message.edit, f"{ud_type}\n│ {progress_text}")
 
 def humanbytes(size: int) -> str:
     """
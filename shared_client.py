@@ -5,12 +5,19 @@
 from telethon import TelegramClient
 from config import API_ID, API_HASH, BOT_TOKEN, STRING
 from pyrogram import Client
+from utils.ratelimit import install
 import sys
 
 client = TelegramClient("telethonbot", API_ID, API_HASH)
 app = Client("pyrogrambot", api_id=API_ID, api_hash=API_HASH, bot_token=BOT_TOKEN)
 userbot = Client("4gbbot", api_id=API_ID, api_hash=API_HASH, session_string=STRING)
 
+# both bot clients are the same account, so they share one set of buckets
+bot_id = int(BOT_TOKEN.split(":")[0]) if BOT_TOKEN and ":" in BOT_TOKEN else None
+install(client, bot_id)
+install(app, bot_id)
+install(userbot)
+
 async def start_client():
     if not client.is_connected():
         await client.start(bot_token=BOT_TOKEN)
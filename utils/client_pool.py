@@ -0,0 +1,122 @@
+# Copyright (c) 2025 devgagan : https://github.com/devgaganin.
+# Licensed under the GNU General Public License v3.0.
+# See LICENSE file in the repository root for full license text.
+
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from utils.transfer import close_media_sessions
+
+logger = logging.getLogger(__name__)
+
+
+class ClientPool:
+    """LRU pool of started per-user Pyrogram clients.
+
+    Clients are started lazily through the factory passed to `acquire`, pinned with
+    `ref`/`unref` while a job uses them, and stopped when the pool is over `max_size`
+    or a client has been idle for `idle_timeout` seconds. The next `acquire` simply
+    starts a fresh one.
+    """
+
+    def __init__(self, name, max_size, idle_timeout):
+        self.name = name
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.clients = OrderedDict()
+        self.last_used = {}
+        self.refs = {}
+        self.locks = {}
+        self.stats = {"hits": 0, "misses": 0, "starts": 0, "evictions": 0}
+
+    def __contains__(self, uid):
+        return uid in self.clients
+
+    def __len__(self):
+        return len(self.clients)
+
+    def _touch(self, uid):
+        self.clients.move_to_end(uid)
+        self.last_used[uid] = time.time()
+
+    def get(self, uid, default=None):
+        client = self.clients.get(uid)
+        if client is None:
+            return default
+        self.stats["hits"] += 1
+        self._touch(uid)
+        return client
+
+    async def acquire(self, uid, factory):
+        client = self.get(uid)
+        if client is not None:
+            return client
+        lock = self.locks.setdefault(uid, asyncio.Lock())
+        async with lock:
+            if uid in self.clients:
+                return self.get(uid)
+            self.stats["misses"] += 1
+            client = await factory()
+            if client is None:
+                return None
+            self.stats["starts"] += 1
+            self.clients[uid] = client
+            self._touch(uid)
+        await self._shrink(keep=uid)  # the caller has not pinned it yet
+        return client
+
+    def ref(self, uid):
+        self.refs[uid] = self.refs.get(uid, 0) + 1
+
+    def unref(self, uid):
+        left = self.refs.get(uid, 0) - 1
+        if left > 0:
+            self.refs[uid] = left
+        else:
+            self.refs.pop(uid, None)
+            if uid in self.clients:
+                self._touch(uid)
+
+    async def drop(self, uid):
+        """Stop and forget the client for uid, whether or not it is in use."""
+        client = self.clients.pop(uid, None)
+        self.last_used.pop(uid, None)
+        self.locks.pop(uid, None)
+        if client is not None:
+            try:
+                await close_media_sessions(client)
+                await client.stop()
+            except Exception as e:
+                logger.warning(f"{self.name}: error stopping client {uid}: {e}")
+        return client is not None
+
+    async def _evict(self, uid):
+        self.stats["evictions"] += 1
+        await self.drop(uid)
+
+    async def _shrink(self, keep=None):
+        while len(self.clients) > self.max_size:
+            idle = next((uid for uid in self.clients if uid != keep and not self.refs.get(uid)), None)
+            if idle is None:
+                break
+            await self._evict(idle)
+
+    async def evict_idle(self):
+        now = time.time()
+        for uid in list(self.clients):
+            if not self.refs.get(uid) and now - self.last_used.get(uid, now) > self.idle_timeout:
+                await self._evict(uid)
+
+    async def run_evictor(self, interval=60):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.evict_idle()
+            except Exception as e:
+                logger.error(f"{self.name}: idle eviction failed: {e}")
+
+    def summary(self):
+        s = self.stats
+        return (f"{self.name}: {len(self.clients)}/{self.max_size} live, {len(self.refs)} pinned, "
+                f"hits {s['hits']}, starts {s['starts']}, evictions {s['evictions']}")
@@ -0,0 +1,131 @@
+# Copyright (c) 2025 devgagan : https://github.com/devgaganin.
+# Licensed under the GNU General Public License v3.0.
+# See LICENSE file in the repository root for full license text.
+
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from config import LOG_GROUP, CONTENT_CACHE_DAYS
+from utils.func import content_cache_collection, get_user_data_key
+
+logger = logging.getLogger(__name__)
+
+MEDIA_KINDS = ("video", "animation", "audio", "voice", "video_note", "sticker", "photo", "document")
+CAPTION_KINDS = {"video", "animation", "audio", "voice", "photo", "document"}
+
+STATS = {"hits": 0, "misses": 0, "stores": 0}
+_index_ready = False
+
+
+def _media(m):
+    for kind in MEDIA_KINDS:
+        media = getattr(m, kind, None)
+        if media:
+            return kind, media
+    return None, None
+
+
+def _key(chat, m, variant):
+    _, media = _media(m)
+    fuid = getattr(media, "file_unique_id", None)
+    if not fuid:
+        return None
+    return {"chat": str(chat), "mid": m.id, "fuid": fuid, "variant": variant}
+
+
+async def variant(user_id):
+    """Fingerprint of the settings baked into an upload (file name and thumbnail).
+
+    Users share cache entries only when their uploads would come out identical. The
+    thumbnail counts by mtime and size, so replacing it invalidates older entries.
+    """
+    thumb = f"{user_id}.jpg"
+    if os.path.exists(thumb):
+        st = os.stat(thumb)
+        thumb = f"{user_id}:{st.st_mtime_ns}:{st.st_size}"
+    else:
+        thumb = ""
+    parts = [
+        await get_user_data_key(user_id, "rename_tag", ""),
+        await get_user_data_key(user_id, "delete_words", []),
+        await get_user_data_key(user_id, "replacement_words", {}),
+        thumb,
+    ]
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _expiry():
+    return datetime.now() + timedelta(days=CONTENT_CACHE_DAYS)
+
+
+async def lookup(chat, m, variant):
+    """Return the cache entry for this source post, or None (counted as a miss)."""
+    key = _key(chat, m, variant)
+    if not key:
+        return None
+    try:
+        doc = await content_cache_collection.find_one(key)
+    except Exception as e:
+        logger.error(f"Error reading content cache: {e}")
+        return None
+    if not doc:
+        STATS["misses"] += 1
+    return doc
+
+
+async def send_cached(c, doc, tcid, caption=None, rtmid=None):
+    """Resend a cached upload with `c` without transferring the file. Returns the sent message or None.
+
+    file_ids only work for the client that received them, so another user's client can
+    reuse an entry only through its LOG_GROUP copy. Only a resend counts as a hit.
+    """
+    entry = (doc.get("files") or {}).get(str(c.me.id))
+    sent = None
+    try:
+        if entry:
+            kwargs = {"caption": caption} if entry["kind"] in CAPTION_KINDS else {}
+            send = getattr(c, f"send_{entry['kind']}")
+            sent = await send(tcid, entry["file_id"], reply_to_message_id=rtmid, **kwargs)
+        elif doc.get("log_id"):
+            sent = await c.copy_message(tcid, LOG_GROUP, doc["log_id"], caption=caption, reply_to_message_id=rtmid)
+    except Exception as e:
+        logger.warning(f"Cached send failed, falling back to transfer: {e}")
+    if not sent:
+        STATS["misses"] += 1
+        return None
+    STATS["hits"] += 1
+    try:
+        await content_cache_collection.update_one(
+            {"_id": doc["_id"]}, {"$set": {"expireAt": _expiry()}, "$inc": {"hits": 1}})
+    except Exception as e:
+        logger.error(f"Error writing content cache: {e}")
+    return sent
+
+
+async def store(c, chat, m, variant, sent, log_id=None):
+    """Remember the file_id `c` got for `sent`, an upload of source post `m`."""
+    global _index_ready
+    key = _key(chat, m, variant)
+    kind, media = _media(sent) if sent else (None, None)
+    if not key or not media:
+        return
+    fields = {f"files.{c.me.id}": {"kind": kind, "file_id": media.file_id}, "expireAt": _expiry()}
+    if log_id:
+        fields["log_id"] = log_id
+    try:
+        if not _index_ready:
+            await content_cache_collection.create_index("expireAt", expireAfterSeconds=0)
+            await content_cache_collection.create_index([("chat", 1), ("mid", 1), ("fuid", 1), ("variant", 1)])
+            _index_ready = True
+        await content_cache_collection.update_one(key, {"$set": fields, "$setOnInsert": {"hits": 0}}, upsert=True)
+        STATS["stores"] += 1
+    except Exception as e:
+        logger.error(f"Error writing content cache: {e}")
+
+
+def summary():
+    total = STATS["hits"] + STATS["misses"]
+    rate = STATS["hits"] * 100 / total if total else 0
+    return f"Content cache: {STATS['hits']}/{total} hits ({rate:.1f}%), {STATS['stores']} stored"
@@ -2,16 +2,16 @@
 # Licensed under the GNU General Public License v3.0.  
 # See LICENSE file in the repository root for full license text.
 
-import concurrent.futures
+import copy
 import time
 import os
 import re
-import cv2
 import logging
-import asyncio
 from datetime import datetime, timedelta
 from motor.motor_asyncio import AsyncIOMotorClient
-from config import MONGO_DB as MONGO_URI, DB_NAME
+from config import MONGO_DB as MONGO_URI, DB_NAME, USER_CACHE_TTL
+from utils.probe import probe
+from utils import thumbs
 
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,6 +26,13 @@ users_collection = db["users"]
 premium_users_collection = db["premium_users"]
 statistics_collection = db["statistics"]
 codedb = db["redeem_code"]
+peers_collection = db["peer_cache"]
+content_cache_collection = db["content_cache"]
+
+# user_id -> (users document or None, fetched_at); every write path below invalidates it
+_user_cache = {}
+# user_id -> (users document the rules were compiled from, TextRules)
+_text_rules = {}
 
 # ------- < start > Session Encoder don't change -------
 
@@ -49,7 +56,7 @@ def is_private_link(link):
 
 
 def thumbnail(sender):
-    return f'{sender}.jpg' if os.path.exists(f'{sender}.jpg') else None
+    return thumbs.from_file(f'{sender}.jpg') if os.path.exists(f'{sender}.jpg') else None
 
 
 def hhmmss(seconds):
@@ -101,25 +108,45 @@ async def is_private_chat(event):
     return event.is_private
 
 
+def invalidate_user_cache(user_id):
+    try:
+        _user_cache.pop(int(user_id), None)
+        _text_rules.pop(int(user_id), None)
+    except (TypeError, ValueError):
+        pass
+
+
+async def _load_user(user_id):
+    uid = int(user_id)
+    cached = _user_cache.get(uid)
+    if cached and time.time() - cached[1] < USER_CACHE_TTL:
+        return cached[0]
+    user_data = await users_collection.find_one({"user_id": uid})
+    _user_cache[uid] = (user_data, time.time())
+    return user_data
+
+
 async def save_user_data(user_id, key, value):
     await users_collection.update_one(
         {"user_id": user_id},
         {"$set": {key: value}},
         upsert=True
     )
+    invalidate_user_cache(user_id)
    # print(users_collection)
 
 
 async def get_user_data_key(user_id, key, default=None):
-    user_data = await users_collection.find_one({"user_id": int(user_id)})
+    user_data = await _load_user(user_id)
   #  print(f"Fetching key '{key}' for user {user_id}: {user_data}")
-    return user_data.get(key, default) if user_data else default
+    # callers mutate lists/dicts before saving them back, so never hand out the cached object
+    return copy.deepcopy(user_data.get(key, default)) if user_data else default
 
 
 async def get_user_data(user_id):
     try:
-        user_data = await users_collection.find_one({"user_id": user_id})
-        return user_data
+        user_data = await _load_user(user_id)
+        return copy.deepcopy(user_data)
     except Exception as e:
    #     logger.error(f"Error retrieving user data for {user_id}: {e}")
         return None
@@ -135,6 +162,7 @@ async def save_user_session(user_id, session_string):
             }},
             upsert=True
         )
+        invalidate_user_cache(user_id)
         logger.info(f"Saved session for user {user_id}")
         return True
     except Exception as e:
@@ -148,6 +176,7 @@ async def remove_user_session(user_id):
             {"user_id": user_id},
             {"$unset": {"session_string": ""}}
         )
+        invalidate_user_cache(user_id)
         logger.info(f"Removed session for user {user_id}")
         return True
     except Exception as e:
@@ -165,6 +194,7 @@ async def save_user_bot(user_id, bot_token):
             }},
             upsert=True
         )
+        invalidate_user_cache(user_id)
         logger.info(f"Saved bot token for user {user_id}")
         return True
     except Exception as e:
@@ -178,6 +208,7 @@ async def remove_user_bot(user_id):
             {"user_id": user_id},
             {"$unset": {"bot_token": ""}}
         )
+        invalidate_user_cache(user_id)
         logger.info(f"Removed bot token for user {user_id}")
         return True
     except Exception as e:
@@ -185,96 +216,70 @@ async def remove_user_bot(user_id):
         return False
 
 
+class TextRules:
+    """A user's replacement_words and delete_words compiled into single-pass matchers.
+
+    Each rule set becomes one alternation regex (longest words first, so the longest match
+    wins), and caption deletion uses a set lookup per word.
+    """
+
+    def __init__(self, replacements, delete_words):
+        self.replacements = {k: v for k, v in (replacements or {}).items() if k}
+        self.delete_words = frozenset(w for w in (delete_words or []) if w)
+        self.replace_re = self._alternation(self.replacements)
+        self.delete_re = self._alternation(self.delete_words)
+
+    @staticmethod
+    def _alternation(words):
+        if not words:
+            return None
+        return re.compile("|".join(re.escape(w) for w in sorted(words, key=len, reverse=True)))
+
+    def _replace(self, text):
+        return self.replace_re.sub(lambda m: self.replacements[m.group(0)], text) if self.replace_re else text
+
+    def caption(self, text):
+        text = self._replace(text)
+        if self.delete_words:
+            text = " ".join(w for w in text.split() if w not in self.delete_words)
+        return text
+
+    def filename(self, name):
+        if self.delete_re:
+            name = self.delete_re.sub("", name)
+        return self._replace(name)
+
+
+async def get_text_rules(user_id):
+    """The user's compiled TextRules, rebuilt only when their settings document changes."""
+    user_data = await _load_user(user_id)
+    cached = _text_rules.get(int(user_id))
+    if cached and cached[0] is user_data:
+        return cached[1]
+    doc = user_data or {}
+    rules = TextRules(doc.get("replacement_words"), doc.get("delete_words"))
+    _text_rules[int(user_id)] = (user_data, rules)
+    return rules
+
+
 async def process_text_with_rules(user_id, text):
     if not text:
         return ""
     
     try:
-        replacements = await get_user_data_key(user_id, "replacement_words", {})
-        delete_words = await get_user_data_key(user_id, "delete_words", [])
-        
-        processed_text = text
-        for word, replacement in replacements.items():
-            processed_text = processed_text.replace(word, replacement)
-        
-        if delete_words:
-            words = processed_text.split()
-            filtered_words = [w for w in words if w not in delete_words]
-            processed_text = " ".join(filtered_words)
-        
-        return processed_text
+        return (await get_text_rules(user_id)).caption(text)
     except Exception as e:
         logger.error(f"Error processing text with rules: {e}")
         return text
 
 
-async def screenshot(video: str, duration: int, sender: str) -> str | None:
-    existing_screenshot = f"{sender}.jpg"
-    if os.path.exists(existing_screenshot):
-        return existing_screenshot
-
-    time_stamp = hhmmss(duration // 2)
-    output_file = datetime.now().isoformat("_", "seconds") + ".jpg"
-
-    cmd = [
-        "ffmpeg",
-        "-ss", time_stamp,
-        "-i", video,
-        "-frames:v", "1",
-        output_file,
-        "-y"
-    ]
-
-    process = await asyncio.create_subprocess_exec(
-        *cmd,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE
-    )
-    
-    stdout, stderr = await process.communicate()
-
-    if os.path.isfile(output_file):
-        return output_file
-    else:
-        print(f"FFmpeg Error: {stderr.decode().strip()}")
-        return None
+async def screenshot(video: str, duration: int, sender: str):
+    return thumbnail(sender) or await thumbs.for_video(video)
 
 
 async def get_video_metadata(file_path):
-    default_values = {'width': 1, 'height': 1, 'duration': 1}
-    loop = asyncio.get_event_loop()
-    executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
-    
-    try:
-        def _extract_metadata():
-            try:
-                vcap = cv2.VideoCapture(file_path)
-                if not vcap.isOpened():
-                    return default_values
-
-                width = round(vcap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                height = round(vcap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                fps = vcap.get(cv2.CAP_PROP_FPS)
-                frame_count = vcap.get(cv2.CAP_PROP_FRAME_COUNT)
-
-                if fps <= 0:
-                    return default_values
-
-                duration = round(frame_count / fps)
-                if duration <= 0:
-                    return default_values
-
-                vcap.release()
-                return {'width': width, 'height': height, 'duration': duration}
-            except Exception as e:
-                logger.error(f"Error in video_metadata: {e}")
-                return default_values
-        
-        return await loop.run_in_executor(executor, _extract_metadata)
-        
-    except Exception as e:
-        logger.error(f"Error in get_video_metadata: {e}")
-        return default_values
+    info = await probe(file_path)
+    return {'width': info['width'], 'height': info['height'], 'duration': info['duration']}
 
 
 async def add_premium_user(user_id, duration_value, duration_unit):
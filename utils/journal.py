@@ -0,0 +1,122 @@
+# Copyright (c) 2025 devgagan : https://github.com/devgaganin.
+# Licensed under the GNU General Public License v3.0.
+# See LICENSE file in the repository root for full license text.
+
+import os
+import json
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class JsonJournal:
+    """Dict persisted as a JSON snapshot plus an append-only journal of changes.
+
+    set/update/delete change `state` in place and queue one journal line, so each call is
+    O(1). A background task appends queued lines off the event loop, fsyncs once per
+    `delay` window and rewrites the snapshot every `compact_every` records.
+    """
+
+    def __init__(self, path, delay=1.0, compact_every=500):
+        self.path = path
+        self.log_path = f"{path}.log"
+        self.delay = delay
+        self.compact_every = compact_every
+        self.state = {}
+        self._pending = []
+        self._since_compact = 0
+        self._event = None
+        self._task = None
+
+    def load(self):
+        state, torn = {}, False
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    state = json.load(f)
+        except Exception as e:
+            logger.error(f"Error reading snapshot {self.path}: {e}")
+        try:
+            if os.path.exists(self.log_path):
+                with open(self.log_path, 'r') as f:
+                    for line in f:
+                        try:
+                            self._apply(state, json.loads(line))
+                            self._since_compact += 1
+                        except ValueError:
+                            torn = True  # torn last line from a crash
+                            break
+        except Exception as e:
+            logger.error(f"Error replaying journal {self.log_path}: {e}")
+        if torn:
+            # new records would be appended onto the fragment and be unreadable, so start a fresh journal
+            try:
+                self._write([], json.dumps(state))
+                self._since_compact = 0
+            except Exception as e:
+                logger.error(f"Error compacting journal {self.log_path}: {e}")
+        self.state = state
+        return state
+
+    @staticmethod
+    def _apply(state, rec):
+        op, key = rec["op"], rec["k"]
+        if op == "set":
+            state[key] = rec["v"]
+        elif op == "upd" and key in state:
+            state[key].update(rec["v"])
+        elif op == "del":
+            state.pop(key, None)
+
+    def _log(self, rec):
+        self._pending.append(json.dumps(rec))
+        if self._task is None or self._task.done():
+            self._event = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        self._event.set()
+
+    def set(self, key, value):
+        self.state[key] = value
+        self._log({"op": "set", "k": key, "v": value})
+
+    def update(self, key, fields):
+        if key in self.state:
+            self.state[key].update(fields)
+            self._log({"op": "upd", "k": key, "v": fields})
+
+    def delete(self, key):
+        if self.state.pop(key, None) is not None:
+            self._log({"op": "del", "k": key})
+
+    async def _run(self):
+        while True:
+            await self._event.wait()
+            await asyncio.sleep(self.delay)  # debounce: one write + fsync per window
+            self._event.clear()
+            lines, self._pending = self._pending, []
+            self._since_compact += len(lines)
+            snapshot = None
+            if self._since_compact >= self.compact_every:
+                snapshot = json.dumps(self.state)
+                self._since_compact = 0
+            try:
+                await asyncio.to_thread(self._write, lines, snapshot)
+            except Exception as e:
+                logger.error(f"Error writing journal {self.log_path}: {e}")
+
+    def _write(self, lines, snapshot):
+        if snapshot is not None:
+            # the snapshot already contains every queued change, so the journal restarts empty
+            tmp = f"{self.path}.tmp"
+            with open(tmp, 'w') as f:
+                f.write(snapshot)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            open(self.log_path, 'w').close()
+            return
+        with open(self.log_path, 'a') as f:
+            f.write("".join(f"{line}\n" for line in lines))
+            f.flush()
+            os.fsync(f.fileno())
@@ -0,0 +1,65 @@
+# Copyright (c) 2025 devgagan : https://github.com/devgaganin.
+# Licensed under the GNU General Public License v3.0.
+# See LICENSE file in the repository root for full license text.
+
+import time
+import asyncio
+import logging
+from pyrogram.errors import FloodWait, SlowmodeWait
+from config import PACE_START_RATE, PACE_MIN_RATE, PACE_MAX_RATE, PACE_STEP
+
+logger = logging.getLogger(__name__)
+
+# errors that carry a server-imposed wait in `.value` seconds
+RETRY_AFTER = (FloodWait, SlowmodeWait)
+
+
+class Pacer:
+    """AIMD pacing of items sent by one account.
+
+    `wait` spaces callers 1/rate seconds apart. Every success raises the rate by `step`
+    (additive increase); a FloodWait/SlowmodeWait halves it and holds everyone until the
+    server's wait has passed (multiplicative decrease).
+    """
+
+    def __init__(self, rate=PACE_START_RATE, min_rate=PACE_MIN_RATE, max_rate=PACE_MAX_RATE, step=PACE_STEP, backoff=0.5):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.step = step
+        self.backoff = backoff
+        self.next_at = 0.0
+        self.floods = 0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_at - now
+            self.next_at = max(now, self.next_at) + 1 / self.rate
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def success(self):
+        self.rate = min(self.max_rate, self.rate + self.step)
+
+    def flood(self, seconds):
+        self.floods += 1
+        self.rate = max(self.min_rate, self.rate * self.backoff)
+        self.next_at = max(self.next_at, time.monotonic() + seconds)
+        logger.warning(f"Told to wait {seconds}s, pacing down to {self.rate:.2f} msg/s")
+
+    def describe(self):
+        return f"{self.rate:.2f} msg/s"
+
+
+_pacers = {}
+
+
+def pacer_for(client):
+    """The shared Pacer of the account behind `client`."""
+    me = getattr(client, "me", None)
+    key = getattr(me, "id", None) or client.name
+    if key not in _pacers:
+        _pacers[key] = Pacer()
+    return _pacers[key]
@@ -0,0 +1,67 @@
+# Copyright (c) 2025 devgagan : https://github.com/devgaganin.
+# Licensed under the GNU General Public License v3.0.
+# See LICENSE file in the repository root for full license text.
+
+import logging
+from pyrogram import raw
+from utils.func import peers_collection
+
+logger = logging.getLogger(__name__)
+
+# (client id, chat as typed by the user) -> cached peer document
+_peers = {}
+
+
+def _key(client, chat):
+    me = getattr(client, "me", None)
+    return str(getattr(me, "id", None) or client.name), str(chat)
+
+
+async def _seed(client, doc):
+    # session-string clients keep peers in memory only, so re-teach them the access hash
+    try:
+        await client.storage.update_peers([(doc["peer_id"], doc["access_hash"], doc["type"], None, None)])
+    except Exception as e:
+        logger.warning(f"Could not seed peer {doc['peer_id']}: {e}")
+
+
+async def resolve_cached(client, chat):
+    """Return the chat id form that last worked for this client and chat, or None."""
+    key = _key(client, chat)
+    doc = _peers.get(key)
+    if doc is None:
+        try:
+            doc = await peers_collection.find_one({"client": key[0], "chat": key[1]})
+        except Exception as e:
+            logger.error(f"Error reading peer cache: {e}")
+            return None
+        if not doc:
+            return None
+        _peers[key] = doc
+    await _seed(client, doc)
+    return doc["chat_id"]
+
+
+async def remember_peer(client, chat, chat_id):
+    """Store the winning chat id form and its access hash after a successful lookup."""
+    try:
+        peer = await client.resolve_peer(chat_id)
+        if isinstance(peer, raw.types.InputPeerChannel):
+            peer_id, access_hash, peer_type = int(f"-100{peer.channel_id}"), peer.access_hash, "channel"
+        elif isinstance(peer, raw.types.InputPeerChat):
+            peer_id, access_hash, peer_type = -peer.chat_id, 0, "group"
+        elif isinstance(peer, raw.types.InputPeerUser):
+            peer_id, access_hash, peer_type = peer.user_id, peer.access_hash, "user"
+        else:
+            return
+        key = _key(client, chat)
+        doc = {"client": key[0], "chat": key[1], "chat_id": chat_id, "peer_id": peer_id,
+               "access_hash": access_hash, "type": peer_type}
+        _peers[key] = doc
+        await peers_collection.update_one({"client": key[0], "chat": key[1]}, {"$set": doc}, upsert=True)
+    except Exception as e:
+        logger.error(f"Error saving peer {chat}: {e}")
+
+
+def forget_peer(client, chat):
+    _peers.pop(_key(client, chat), None)
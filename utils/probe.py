@@ -0,0 +1,160 @@
+# Copyright (c) 2025 devgagan : https://github.com/devgaganin.
+# Licensed under the GNU General Public License v3.0.
+# See LICENSE file in the repository root for full license text.
+
+import os
+import json
+import shutil
+import asyncio
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from config import PROBE_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {'width': 1, 'height': 1, 'duration': 1, 'vcodec': None, 'acodec': None, 'thumb': None}
+CACHE_SIZE = 256
+
+_sem = asyncio.Semaphore(PROBE_CONCURRENCY)
+_executor = ThreadPoolExecutor(max_workers=PROBE_CONCURRENCY, thread_name_prefix="probe")  # cv2 fallback only
+_cache = OrderedDict()   # (path, size, mtime) -> probe result
+_pending = {}            # same key (+ "frame") -> task, so concurrent callers share one probe or grab
+FFPROBE = shutil.which("ffprobe")
+
+
+async def _run(*cmd):
+    proc = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    out, err = await proc.communicate()
+    return proc.returncode, out, err
+
+
+async def _ffprobe(path):
+    code, out, err = await _run(
+        FFPROBE, "-v", "error", "-show_entries",
+        "format=duration:stream=codec_type,codec_name,width,height,duration", "-of", "json", path)
+    if code != 0:
+        raise RuntimeError(err.decode(errors="ignore").strip())
+    data = json.loads(out or b"{}")
+    streams = data.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), {})
+    duration = float(data.get("format", {}).get("duration") or video.get("duration") or 0)
+    return {
+        'width': int(video.get('width') or 1), 'height': int(video.get('height') or 1),
+        'duration': max(1, round(duration)),
+        'vcodec': video.get('codec_name'), 'acodec': audio.get('codec_name'),
+    }
+
+
+def _cv2_probe(path):
+    import cv2
+    vcap = cv2.VideoCapture(path)
+    try:
+        if not vcap.isOpened():
+            return {}
+        fps = vcap.get(cv2.CAP_PROP_FPS)
+        frames = vcap.get(cv2.CAP_PROP_FRAME_COUNT)
+        return {
+            'width': round(vcap.get(cv2.CAP_PROP_FRAME_WIDTH)) or 1,
+            'height': round(vcap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or 1,
+            'duration': max(1, round(frames / fps)) if fps > 0 else 1,
+        }
+    finally:
+        vcap.release()
+
+
+async def _frame(path, duration):
+    out = f"{os.path.splitext(path)[0]}.thumb.jpg"
+    seek = str(max(0, duration // 2))
+    # input seeking that stops at the nearest keyframe and decodes keyframes only
+    code, _, err = await _run("ffmpeg", "-skip_frame", "nokey", "-noaccurate_seek", "-ss", seek, "-i", path,
+                              "-an", "-sn", "-frames:v", "1", out, "-y")
+    if os.path.isfile(out):
+        return out
+    logger.error(f"FFmpeg Error: {err.decode(errors='ignore').strip()}")
+    return None
+
+
+async def _probe(path):
+    async with _sem:
+        result = dict(DEFAULTS)
+        try:
+            if FFPROBE:
+                result.update(await _ffprobe(path))
+            else:
+                result.update(await asyncio.get_running_loop().run_in_executor(_executor, _cv2_probe, path))
+        except Exception as e:
+            logger.error(f"Error probing {path}: {e}")
+        return result
+
+
+async def _grab(path, entry):
+    async with _sem:
+        try:
+            entry['thumb'] = await _frame(path, entry['duration'])
+        except Exception as e:
+            logger.error(f"Error grabbing a frame from {path}: {e}")
+        return entry['thumb']
+
+
+def _key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return os.path.abspath(path), st.st_size, st.st_mtime
+
+
+def _settle(key, task):
+    # runs even if every awaiting caller was cancelled, so the result is never lost
+    _pending.pop(key, None)
+    if task.cancelled() or task.exception():
+        return
+    _cache[key] = task.result()
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+async def probe(path):
+    """Dimensions, duration and codecs of a media file, in one call.
+
+    Results are cached by (path, size, mtime), so asking again for the same file costs
+    nothing. At most PROBE_CONCURRENCY probes run at once across the whole process.
+    """
+    key = _key(path)
+    if key is None:
+        return dict(DEFAULTS)
+    if key in _cache:
+        _cache.move_to_end(key)
+        return dict(_cache[key])
+    task = _pending.get(key)
+    if task is None:
+        task = _pending[key] = asyncio.create_task(_probe(path))
+        task.add_done_callback(lambda t: _settle(key, t))
+    return dict(await asyncio.shield(task))
+
+
+async def frame(path):
+    """Path of a midpoint frame of a video, grabbed on first request and kept with its probe result."""
+    await probe(path)
+    key = _key(path)
+    entry = _cache.get(key)
+    if entry is None or not (entry['vcodec'] or not FFPROBE):
+        return None
+    if entry['thumb'] and os.path.exists(entry['thumb']):
+        return entry['thumb']
+    task = _pending.get(key + ("frame",))
+    if task is None:
+        task = _pending[key + ("frame",)] = asyncio.create_task(_grab(path, entry))
+        task.add_done_callback(lambda t: _pending.pop(key + ("frame",), None))
+    return await asyncio.shield(task)
+
+
+def forget(path):
+    """Drop cached results for `path` and delete any frame still on disk."""
+    full = os.path.abspath(path)
+    for key in [k for k in _cache if k[0] == full]:
+        thumb = _cache.pop(key).get('thumb')
+        if thumb and os.path.exists(thumb):
+            os.remove(thumb)
@@ -0,0 +1,103 @@
+# Copyright (c) 2025 devgagan : https://github.com/devgaganin.
+# Licensed under the GNU General Public License v3.0.
+# See LICENSE file in the repository root for full license text.
+
+import time
+import asyncio
+import logging
+from config import PROGRESS_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+STALE_AFTER = 600  # forget messages that stopped reporting without calling done()
+
+
+class ProgressScheduler:
+    """Coalesces progress edits so transfer callbacks never wait on Telegram.
+
+    `update` only records the newest text for a message. A background task edits each
+    chat at most once per `interval` seconds with the latest frame of each of its
+    messages; older frames are dropped. `done` forgets a message once its transfer is over.
+    """
+
+    def __init__(self, interval=PROGRESS_INTERVAL):
+        self.interval = interval
+        self.frames = {}     # (chat, message) -> [edit, text, updated]
+        self.shown = {}      # (chat, message) -> last text sent
+        self.flushed = {}    # chat -> time of its last flush
+        self.inflight = {}   # (chat, message) -> running edit task
+        self.task = None
+
+    def update(self, key, edit, text):
+        frame = self.frames.get(key)
+        if frame:
+            frame[1], frame[2] = text, time.time()
+        else:
+            self.frames[key] = [edit, text, time.time()]
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def done(self, key):
+        """Drop a message's state and cancel an edit still on its way, so it cannot overwrite
+        whatever the caller shows next. Never waits: that edit may be queued behind the whole
+        bot's edit rate limit."""
+        self.frames.pop(key, None)
+        self.shown.pop(key, None)
+        task = self.inflight.pop(key, None)
+        if task:
+            task.cancel()
+
+    async def _edit(self, key, edit, text):
+        try:
+            await edit(text)
+            self.shown[key] = text
+        except Exception as e:
+            logger.debug(f"Progress edit for {key} failed: {e}")
+        finally:
+            if self.inflight.get(key) is asyncio.current_task():
+                self.inflight.pop(key, None)
+
+    async def _run(self):
+        while self.frames:
+            await asyncio.sleep(1)
+            now = time.time()
+            due = {key[0] for key in self.frames if now - self.flushed.get(key[0], 0) >= self.interval}
+            for key, (edit, text, updated) in list(self.frames.items()):
+                if now - updated > STALE_AFTER:
+                    self.frames.pop(key, None)
+                    self.shown.pop(key, None)
+                    continue
+                if key[0] not in due or text == self.shown.get(key) or key in self.inflight:
+                    continue
+                self.flushed[key[0]] = now
+                self.inflight[key] = asyncio.create_task(self._edit(key, edit, text))
+        self.flushed.clear()
+
+
+SCHEDULER = ProgressScheduler()
+
+
+def update(chat_id, message_id, edit, text):
+    """Record the latest progress text for a message; `edit(text)` is called when it is flushed."""
+    SCHEDULER.update((chat_id, message_id), edit, text)
+
+
+async def done(chat_id, message_id):
+    await SCHEDULER.done((chat_id, message_id))
+
+
+class Sink:
+    """Message stand-in for libraries that edit a reply themselves (devgagantools' fast_upload).
+
+    Its `edit` goes through the scheduler instead of straight to Telegram.
+    """
+
+    def __init__(self, message):
+        self.message = message
+        self.key = (message.chat_id, message.id)
+
+    async def edit(self, text, *args, **kwargs):
+        SCHEDULER.update(self.key, self.message.edit, text)
+
+    async def done(self):
+        await SCHEDULER.done(self.key)
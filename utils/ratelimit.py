@@ -0,0 +1,99 @@
+# Copyright (c) 2025 devgagan : https://github.com/devgaganin.
+# Licensed under the GNU General Public License v3.0.
+# See LICENSE file in the repository root for full license text.
+
+import time
+import asyncio
+import logging
+from config import EDIT_RATE, SEND_RATE, MEDIA_RATE
+
+logger = logging.getLogger(__name__)
+
+# raw request name (Pyrogram class name, or Telethon's without "Request") -> bucket
+BUCKETS = {
+    "EditMessage": "edit", "EditInlineBotMessage": "edit",
+    "SendMessage": "send", "SendMedia": "send", "SendMultiMedia": "send", "ForwardMessages": "send",
+    "GetMessages": "media", "GetHistory": "media", "GetReplies": "media",
+}
+RATES = {"edit": EDIT_RATE, "send": SEND_RATE, "media": MEDIA_RATE}
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`; take() waits for a token."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, rate * 2)
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+        self.lock = asyncio.Lock()
+        self.waited = 0.0
+
+    async def take(self):
+        async with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            if self.tokens < 1:
+                delay = (1 - self.tokens) / self.rate
+                self.waited += delay
+                await asyncio.sleep(delay)  # holding the lock keeps waiters in FIFO order
+                self.tokens, self.stamp = 1, time.monotonic()
+            self.tokens -= 1
+
+
+_buckets = {}
+
+
+def bucket(key, kind):
+    """The shared bucket of one kind for an account."""
+    b = _buckets.get((key, kind))
+    if b is None:
+        b = _buckets[(key, kind)] = TokenBucket(RATES[kind])
+    return b
+
+
+def _kind(query):
+    name = type(query).__name__
+    return BUCKETS.get(name[:-7] if name.endswith("Request") else name)
+
+
+def _pyro_key(client):
+    me = getattr(client, "me", None)
+    return getattr(me, "id", None) or client.name
+
+
+def install(client, key=None):
+    """Route every request `client` makes through the account's buckets.
+
+    Works for Pyrogram clients (wraps invoke) and Telethon clients (wraps _call). Pass
+    `key` when two clients share one account, e.g. the Pyrogram and Telethon bot; the
+    default is the Pyrogram account id, read on each call.
+    """
+    if hasattr(client, "_call"):
+        call = client._call
+
+        async def _call(sender, request, *args, **kwargs):
+            kind = _kind(request)
+            if kind:
+                await bucket(key or id(client), kind).take()
+            return await call(sender, request, *args, **kwargs)
+
+        client._call = _call
+    else:
+        invoke = client.invoke
+
+        async def _invoke(query, *args, **kwargs):
+            kind = _kind(query)
+            if kind:
+                await bucket(key or _pyro_key(client), kind).take()
+            return await invoke(query, *args, **kwargs)
+
+        client.invoke = _invoke
+    return client
+
+
+def summary():
+    busy = sorted(_buckets.items(), key=lambda kv: kv[1].waited, reverse=True)[:5]
+    lines = [f"{k[0]} {k[1]}: waited {b.waited:.1f}s" for k, b in busy if b.waited]
+    return "Rate limiter: " + ("; ".join(lines) if lines else "no throttling")
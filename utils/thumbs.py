@@ -0,0 +1,101 @@
+# Copyright (c) 2025 devgagan : https://github.com/devgaganin.
+# Licensed under the GNU General Public License v3.0.
+# See LICENSE file in the repository root for full license text.
+
+import io
+import os
+import asyncio
+import logging
+from collections import OrderedDict
+from PIL import Image
+from utils import probe
+
+logger = logging.getLogger(__name__)
+
+MAX_SIDE = 320            # Telegram ignores thumbnails larger than 320px...
+MAX_BYTES = 200 * 1024    # ...or 200 KB
+CACHE_SIZE = 128
+
+_cache = OrderedDict()    # (path, size, mtime) -> ready-to-send JPEG bytes
+
+
+def _key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return os.path.abspath(path), st.st_size, st.st_mtime
+
+
+def fit(src):
+    """Downscale an image (path or bytes) to a JPEG within Telegram's thumbnail limits."""
+    with Image.open(io.BytesIO(src) if isinstance(src, bytes) else src) as im:
+        im = im.convert("RGB")
+        im.thumbnail((MAX_SIDE, MAX_SIDE))
+        for quality in (90, 80, 70, 60, 50, 40):
+            out = io.BytesIO()
+            im.save(out, "JPEG", quality=quality, optimize=True)
+            if out.tell() <= MAX_BYTES:
+                break
+    return out.getvalue()
+
+
+def _named(data):
+    if not data:
+        return None
+    f = io.BytesIO(data)
+    f.name = "thumb.jpg"
+    return f
+
+
+def _remember(key, data):
+    _cache[key] = data
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+def from_file(path):
+    """Cached, downscaled copy of an image on disk as a fresh file-like object, or None."""
+    key = _key(path)
+    if key is None:
+        return None
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _named(_cache[key])
+    try:
+        data = fit(path)
+    except Exception as e:
+        logger.error(f"Error preparing thumbnail {path}: {e}")
+        return None
+    _remember(key, data)
+    return _named(data)
+
+
+async def for_video(path):
+    """Thumbnail for a video from its probe frame; the frame file is deleted once loaded."""
+    key = _key(path)
+    if key is None:
+        return None
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _named(_cache[key])
+    frame = await probe.frame(path)
+    if not frame or not os.path.exists(frame):
+        return None
+    try:
+        data = await asyncio.to_thread(fit, frame)
+    except Exception as e:
+        logger.error(f"Error preparing thumbnail for {path}: {e}")
+        return None
+    finally:
+        os.remove(frame)
+    _remember(key, data)
+    return _named(data)
+
+
+def release(path):
+    """Forget everything generated for `path` once its upload is over."""
+    full = os.path.abspath(path)
+    for key in [k for k in _cache if k[0] == full]:
+        _cache.pop(key, None)
+    probe.forget(path)
@@ -0,0 +1,309 @@
+# Copyright (c) 2025 devgagan : https://github.com/devgaganin.
+# Licensed under the GNU General Public License v3.0.
+# See LICENSE file in the repository root for full license text.
+
+import os
+import math
+import asyncio
+import inspect
+import logging
+from pyrogram import raw, types, utils
+from pyrogram.session import Session, Auth
+from pyrogram.file_id import FileId, FileType
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_PART = 1024 * 1024
+PART_RETRIES = 3
+
+# authorized media sessions per (client, dc_id), kept open across transfers like Pyrogram's media_sessions
+_pools = {}
+_pool_locks = {}
+
+
+async def _report(progress, current, total, args):
+    if not progress:
+        return
+    try:
+        if inspect.iscoroutinefunction(progress):
+            await progress(current, total, *args)
+        else:
+            progress(current, total, *args)
+    except Exception as e:
+        logger.debug(f"Progress callback failed: {e}")
+
+
+async def _media_sessions(client, dc_id, count):
+    """`count` media sessions to dc_id sharing one authorization, created once and then reused.
+
+    The auth key is created and imported only for the first session to a DC; later
+    transfers borrow the open sessions, opening more only if they need more workers.
+    """
+    pool = _pools.setdefault((client, dc_id), [])
+    async with _pool_locks.setdefault((client, dc_id), asyncio.Lock()):
+        if len(pool) < count:
+            test_mode = await client.storage.test_mode()
+            home = dc_id == await client.storage.dc_id()
+            if pool:
+                auth_key = pool[0].auth_key
+            else:
+                auth_key = await client.storage.auth_key() if home else await Auth(client, dc_id, test_mode).create()
+            while len(pool) < count:
+                session = Session(client, dc_id, auth_key, test_mode, is_media=True)
+                await session.start()
+                if not pool and not home:
+                    try:
+                        exported = await client.invoke(raw.functions.auth.ExportAuthorization(dc_id=dc_id))
+                        await session.invoke(raw.functions.auth.ImportAuthorization(id=exported.id, bytes=exported.bytes))
+                    except Exception:
+                        await _close([session])
+                        raise
+                pool.append(session)
+    return pool[:count]
+
+
+async def close_media_sessions(client):
+    """Stop the media sessions kept for `client`; call before stopping the client."""
+    for key in [k for k in _pools if k[0] is client]:
+        _pool_locks.pop(key, None)
+        await _close(_pools.pop(key))
+
+
+async def _close(sessions):
+    for session in sessions:
+        try:
+            await session.stop()
+        except Exception:
+            pass
+
+
+async def _run_all(coros):
+    """Gather worker coroutines, cancelling the rest as soon as one fails."""
+    tasks = [asyncio.create_task(c) for c in coros]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def _location(fid: FileId):
+    if fid.file_type == FileType.PHOTO:
+        return raw.types.InputPhotoFileLocation(
+            id=fid.media_id, access_hash=fid.access_hash,
+            file_reference=fid.file_reference, thumb_size=fid.thumbnail_size)
+    return raw.types.InputDocumentFileLocation(
+        id=fid.media_id, access_hash=fid.access_hash,
+        file_reference=fid.file_reference, thumb_size=fid.thumbnail_size)
+
+
+async def parallel_download(client, message, file_name, connections=4, progress=None, progress_args=()):
+    """Download a message's media over several media sessions into a preallocated file.
+
+    The file is split into 1 MiB parts that `connections` workers fetch concurrently and
+    write in place. Progress is reported as (current, total, *progress_args), like
+    Pyrogram's own callbacks. Returns the absolute path of the downloaded file.
+    """
+    media = getattr(message, message.media.value)
+    fid = FileId.decode(media.file_id)
+    size = media.file_size
+    location = _location(fid)
+
+    path = file_name if os.path.isabs(file_name) else os.path.abspath(os.path.join("downloads", file_name))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    queue = asyncio.Queue()
+    for part in range(math.ceil(size / DOWNLOAD_PART)):
+        queue.put_nowait(part)
+    state = {"done": 0}
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.ftruncate(fd, size)
+        sessions = await _media_sessions(client, fid.dc_id, max(1, min(connections, queue.qsize())))
+
+        async def worker(session):
+            while not queue.empty():
+                part = queue.get_nowait()
+                for attempt in range(PART_RETRIES):
+                    try:
+                        r = await session.invoke(
+                            raw.functions.upload.GetFile(location=location, offset=part * DOWNLOAD_PART, limit=DOWNLOAD_PART),
+                            sleep_threshold=30)
+                        break
+                    except Exception as e:
+                        if attempt == PART_RETRIES - 1:
+                            raise
+                        logger.warning(f"Retrying part {part} of {path}: {e}")
+                        await asyncio.sleep(1 + attempt)
+                if not isinstance(r, raw.types.upload.File):
+                    raise RuntimeError("CDN-hosted files are not supported by the parallel engine")
+                await asyncio.to_thread(os.pwrite, fd, r.bytes, part * DOWNLOAD_PART)
+                state["done"] += len(r.bytes)
+                await _report(progress, min(state["done"], size), size, progress_args)
+
+        await _run_all(worker(s) for s in sessions)
+    except Exception:
+        os.close(fd)
+        fd = None
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    finally:
+        if fd is not None:
+            os.close(fd)
+    return path
+
+
+UPLOAD_PART = 512 * 1024
+BIG_FILE = 10 * 1024 * 1024  # saveBigFilePart is only accepted above this size
+
+
+async def _save_part(session, file_id, part, total, chunk, label, state):
+    """saveBigFilePart with retries; every retry is logged with its part number."""
+    for attempt in range(PART_RETRIES):
+        try:
+            await session.invoke(raw.functions.upload.SaveBigFilePart(
+                file_id=file_id, file_part=part, file_total_parts=total, bytes=chunk))
+            return
+        except Exception as e:
+            if attempt == PART_RETRIES - 1:
+                raise
+            state["retries"] += 1
+            logger.warning(f"Retrying part {part}/{total} of {label} (attempt {attempt + 2}): {e}")
+            await asyncio.sleep(1 + attempt)
+
+
+async def parallel_upload(client, path, workers=4, progress=None, progress_args=()):
+    """Upload a file as saveBigFilePart chunks over several media sessions.
+
+    Returns the InputFileBig to attach to a send call. Failed parts are retried up to
+    PART_RETRIES times and every retry is logged with its part number.
+    """
+    size = os.path.getsize(path)
+    if size <= BIG_FILE:
+        raise ValueError("parallel upload is only used for files above 10 MiB")
+    total = math.ceil(size / UPLOAD_PART)
+    file_id = client.rnd_id()
+
+    queue = asyncio.Queue()
+    for part in range(total):
+        queue.put_nowait(part)
+    state = {"done": 0, "retries": 0}
+
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        sessions = await _media_sessions(client, await client.storage.dc_id(), max(1, min(workers, total)))
+
+        async def worker(session):
+            while not queue.empty():
+                part = queue.get_nowait()
+                chunk = await asyncio.to_thread(os.pread, fd, UPLOAD_PART, part * UPLOAD_PART)
+                await _save_part(session, file_id, part, total, chunk, path, state)
+                state["done"] += len(chunk)
+                await _report(progress, min(state["done"], size), size, progress_args)
+
+        await _run_all(worker(s) for s in sessions)
+    finally:
+        os.close(fd)
+    if state["retries"]:
+        logger.info(f"Uploaded {path} in {total} parts with {state['retries']} retries")
+    return raw.types.InputFileBig(id=file_id, parts=total, name=os.path.basename(path))
+
+
+async def relay_upload(source, message, client, name, workers=4, window=8, progress=None, progress_args=()):
+    """Stream a message's media from `source` straight into a saveBigFilePart upload by `client`.
+
+    Downloaded chunks are cut into upload parts and handed to the upload sessions through
+    a queue of at most `window` parts, so only that much of the file is ever held in RAM
+    and nothing touches the disk. Returns the InputFileBig, like parallel_upload.
+    """
+    size = getattr(message, message.media.value).file_size
+    if size <= BIG_FILE:
+        raise ValueError("relay upload is only used for files above 10 MiB")
+    total = math.ceil(size / UPLOAD_PART)
+    file_id = client.rnd_id()
+    parts = asyncio.Queue(maxsize=window)
+    state = {"done": 0, "retries": 0}
+
+    sessions = await _media_sessions(client, await client.storage.dc_id(), max(1, min(workers, total)))
+
+    async def produce():
+        buf, part = bytearray(), 0
+        async for chunk in source.stream_media(message):
+            buf += chunk
+            while len(buf) >= UPLOAD_PART:
+                await parts.put((part, bytes(buf[:UPLOAD_PART])))
+                del buf[:UPLOAD_PART]
+                part += 1
+        if buf:
+            await parts.put((part, bytes(buf)))
+            part += 1
+        if part != total:
+            raise RuntimeError(f"source ended after {part} of {total} parts")
+        for _ in sessions:
+            await parts.put(None)
+
+    async def worker(session):
+        while (item := await parts.get()) is not None:
+            part, chunk = item
+            await _save_part(session, file_id, part, total, chunk, name, state)
+            state["done"] += len(chunk)
+            await _report(progress, min(state["done"], size), size, progress_args)
+
+    await _run_all([produce()] + [worker(s) for s in sessions])
+    return raw.types.InputFileBig(id=file_id, parts=total, name=name)
+
+
+def _reply_to(message_id):
+    if not message_id:
+        return {}
+    if hasattr(raw.types, "InputReplyToMessage"):
+        return {"reply_to": raw.types.InputReplyToMessage(reply_to_msg_id=message_id)}
+    return {"reply_to_msg_id": message_id}
+
+
+async def send_uploaded(client, chat_id, file, name, kind, caption=None, thumb=None, duration=0, width=0, height=0,
+                        reply_to_message_id=None):
+    """Send an already uploaded InputFile as a video, audio or document.
+
+    Mirrors what send_video/send_audio/send_document build, so the returned Message can
+    be used the same way. Once SendMedia returns the file is sent: if no Message can be
+    parsed from its updates, the raw Updates are returned instead of None.
+    """
+    attributes = [raw.types.DocumentAttributeFilename(file_name=name)]
+    if kind == "video":
+        attributes.append(raw.types.DocumentAttributeVideo(
+            supports_streaming=True, duration=duration or 0, w=width or 0, h=height or 0))
+    elif kind == "audio":
+        attributes.append(raw.types.DocumentAttributeAudio(duration=duration or 0))
+    media = raw.types.InputMediaUploadedDocument(
+        mime_type=client.guess_mime_type(name) or "application/octet-stream",
+        file=file,
+        thumb=await client.save_file(thumb) if thumb else None,
+        attributes=attributes,
+    )
+    text = await utils.parse_text_entities(client, caption or "", None, None)
+    r = await client.invoke(raw.functions.messages.SendMedia(
+        peer=await client.resolve_peer(chat_id), media=media, random_id=client.rnd_id(),
+        **text, **_reply_to(reply_to_message_id)))
+    for update in r.updates:
+        if isinstance(update, (raw.types.UpdateNewMessage, raw.types.UpdateNewChannelMessage)):
+            try:
+                return await types.Message._parse(
+                    client, update.message, {u.id: u for u in r.users}, {c.id: c for c in r.chats},
+                    replies=0)
+            except Exception as e:
+                logger.warning(f"Sent, but could not parse the message: {e}")
+                break
+    return r
+
+
+async def parallel_send(client, chat_id, path, kind, reply_to_message_id=None, workers=4,
+                        progress=None, progress_args=(), **kwargs):
+    """Upload `path` with parallel_upload and send it with send_uploaded."""
+    file = await parallel_upload(client, path, workers, progress, progress_args)
+    return await send_uploaded(client, chat_id, file, os.path.basename(path), kind,
+                               reply_to_message_id=reply_to_message_id, **kwargs)
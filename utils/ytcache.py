@@ -0,0 +1,104 @@
+# Copyright (c) 2025 devgagan : https://github.com/devgaganin.
+# Licensed under the GNU General Public License v3.0.
+# See LICENSE file in the repository root for full license text.
+
+import json
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from config import YTDL_CACHE_SIZE, YTDL_INFO_TTL, CONTENT_CACHE_DAYS
+
+logger = logging.getLogger(__name__)
+
+# yt-dlp options that change what comes out; paths, cookies and hooks do not
+OPTION_KEYS = ("format", "format_sort", "merge_output_format", "postprocessors", "noplaylist")
+TRACKING = {"si", "feature", "igsh", "igshid", "fbclid", "gclid", "ref", "ref_src", "pp"}
+HEAVY = ("automatic_captions", "subtitles", "heatmap")  # large and unused by our downloads
+MEDIA_TTL = CONTENT_CACHE_DAYS * 86400
+
+STATS = {"hits": 0, "misses": 0, "stores": 0, "info": 0}
+_cache = OrderedDict()  # key -> {"info", "info_at", "media", "caption", "media_at"}
+
+
+def normalize(url):
+    """Canonical form of a link, so share-sheet variants of one video map to one key."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    for prefix in ("www.", "m.", "music."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    path = parts.path.rstrip("/")
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k not in TRACKING and not k.startswith("utm_")]
+    if host == "youtu.be" and path:
+        host, query, path = "youtube.com", [("v", path.lstrip("/"))] + query, "/watch"
+    elif host == "youtube.com" and path.startswith(("/shorts/", "/live/")):
+        query, path = [("v", path.split("/")[2])] + query, "/watch"
+    return urlunsplit(("https", host, path, urlencode(sorted(query)), ""))
+
+
+def key(url, opts):
+    picked = {k: opts.get(k) for k in OPTION_KEYS}
+    digest = hashlib.sha1(json.dumps(picked, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f"{normalize(url)}#{digest}"
+
+
+def _entry(k, create=False):
+    entry = _cache.get(k)
+    if entry is None and create:
+        entry = _cache[k] = {}
+        while len(_cache) > YTDL_CACHE_SIZE:
+            _cache.popitem(last=False)
+    if entry is not None:
+        _cache.move_to_end(k)
+    return entry
+
+
+def media(k):
+    """(media, caption) of an earlier upload for this key, or None. Counts as a hit or miss."""
+    entry = _entry(k)
+    if entry and entry.get("media") is not None and time.time() - entry["media_at"] < MEDIA_TTL:
+        STATS["hits"] += 1
+        return entry["media"], entry["caption"]
+    STATS["misses"] += 1
+    return None
+
+
+def info(k):
+    """Extracted info still young enough for its stream URLs to work, or None."""
+    entry = _entry(k)
+    if entry and entry.get("info") and time.time() - entry["info_at"] < YTDL_INFO_TTL:
+        STATS["info"] += 1
+        return entry["info"]
+    return None
+
+
+def store_info(k, data):
+    if not data:
+        return
+    entry = _entry(k, create=True)
+    entry["info"] = {f: v for f, v in data.items() if f not in HEAVY}
+    entry["info_at"] = time.time()
+
+
+def store_media(k, sent, caption):
+    """Remember the media of `sent`, the message our upload produced, for resending."""
+    if not getattr(sent, "media", None):
+        return
+    entry = _entry(k, create=True)
+    entry.update(media=sent.media, caption=caption, media_at=time.time())
+    STATS["stores"] += 1
+
+
+def forget_media(k):
+    entry = _cache.get(k)
+    if entry:
+        entry.pop("media", None)
+
+
+def summary():
+    total = STATS["hits"] + STATS["misses"]
+    rate = STATS["hits"] * 100 / total if total else 0
+    return (f"yt-dlp cache: {STATS['hits']}/{total} hits ({rate:.1f}%), {STATS['info']} info reuses, "
+            f"{STATS['stores']} stored, {len(_cache)}/{YTDL_CACHE_SIZE} entries")
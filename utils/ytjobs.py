@@ -0,0 +1,163 @@
+# Copyright (c) 2025 devgagan : https://github.com/devgaganin.
+# Licensed under the GNU General Public License v3.0.
+# See LICENSE file in the repository root for full license text.
+
+import os
+import time
+import queue
+import signal
+import asyncio
+import inspect
+import logging
+import multiprocessing
+from config import YTDL_WORKERS, YTDL_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+_ctx = multiprocessing.get_context("spawn")
+_slots = asyncio.Semaphore(YTDL_WORKERS)
+PROGRESS_KEYS = ("status", "downloaded_bytes", "total_bytes", "total_bytes_estimate", "speed", "eta", "filename")
+
+
+class JobError(Exception):
+    pass
+
+
+class JobCancelled(JobError):
+    pass
+
+
+class JobRejected(JobError):
+    """The extracted info broke one of the job's limits; `reason` names which one."""
+
+    def __init__(self, reason):
+        super().__init__(f"over the {reason} limit")
+        self.reason = reason
+
+
+def _over(info, limits):
+    duration = info.get("duration") or 0
+    if limits.get("duration") and duration > limits["duration"]:
+        return "duration"
+    size = info.get("filesize_approx") or info.get("filesize") or sum(
+        f.get("filesize") or f.get("filesize_approx") or 0 for f in info.get("requested_formats") or ())
+    if limits.get("size") and size > limits["size"]:
+        return "size"
+    return None
+
+
+def _work(url, opts, download, limits, info, out):
+    """Runs in the worker process: one yt-dlp extraction (and download), reporting through `out`.
+
+    The URL is resolved once, or not at all when `info` from an earlier extraction is given;
+    the download reuses that info dict through process_ie_result after the limits have been
+    checked, so nothing is fetched for a rejected job.
+    """
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()  # so a kill also takes down ffmpeg and other helpers yt-dlp started
+    import yt_dlp
+
+    last = [0.0]
+
+    def hook(d):
+        now = time.time()
+        if d.get("status") != "downloading" or now - last[0] >= 1:
+            last[0] = now
+            out.put(("progress", {k: d.get(k) for k in PROGRESS_KEYS}))
+
+    try:
+        with yt_dlp.YoutubeDL(dict(opts, progress_hooks=[hook])) as ydl:
+            if info is None:
+                info = ydl.extract_info(url, download=False)
+                out.put(("info", ydl.sanitize_info(info)))
+            reason = _over(info, limits or {})
+            if reason:
+                out.put(("rejected", reason))
+                return
+            if download:
+                info = ydl.process_ie_result(info, download=True)
+            out.put(("done", ydl.sanitize_info(info)))
+    except BaseException as e:
+        out.put(("error", f"{type(e).__name__}: {e}"))
+
+
+class YtJob:
+    """A yt-dlp run in its own worker process.
+
+    At most YTDL_WORKERS jobs run at once; the rest wait for a slot. Progress hook data comes
+    back through a queue and is passed to `on_progress`. cancel() and the timeout kill the
+    worker's whole process group, so neither leaves a stuck extraction behind.
+
+    `limits` ({"duration": seconds, "size": bytes}) are checked against the extracted info
+    before the download starts; a job over them raises JobRejected. Passing `info` skips
+    extraction; otherwise `self.info` holds what was extracted, for callers that cache it.
+    """
+
+    def __init__(self, url, opts, download=True, limits=None, info=None):
+        self.url, self.opts, self.download, self.limits = url, opts, download, limits
+        self.cached = info
+        self.info = None
+        self.proc = None
+        self.cancelled = False
+
+    async def run(self, on_progress=None, timeout=YTDL_TIMEOUT):
+        async with _slots:
+            if self.cancelled:
+                raise JobCancelled("cancelled")
+            out = _ctx.Queue()
+            args = (self.url, self.opts, self.download, self.limits, self.cached, out)
+            self.proc = _ctx.Process(target=_work, args=args, daemon=True)
+            self.proc.start()
+            try:
+                return await asyncio.wait_for(self._pump(out, on_progress), timeout)
+            except asyncio.TimeoutError:
+                raise JobError(f"timed out after {timeout}s")
+            finally:
+                self._kill()
+                await asyncio.to_thread(self.proc.join, 1)  # reap it without blocking the loop
+                out.close()
+
+    async def _pump(self, out, on_progress):
+        while True:
+            try:
+                kind, data = out.get_nowait()
+            except queue.Empty:
+                if self.cancelled:
+                    raise JobCancelled("cancelled")
+                if not self.proc.is_alive():
+                    try:
+                        kind, data = await asyncio.to_thread(out.get, True, 1)
+                    except queue.Empty:
+                        raise JobError(f"worker exited with code {self.proc.exitcode}")
+                else:
+                    await asyncio.sleep(0.25)
+                    continue
+            if kind == "progress":
+                if on_progress:
+                    try:
+                        r = on_progress(data)
+                        if inspect.isawaitable(r):
+                            await r
+                    except Exception as e:
+                        logger.debug(f"Progress callback failed: {e}")
+            elif kind == "info":
+                self.info = data
+            elif kind == "done":
+                return data
+            elif kind == "rejected":
+                raise JobRejected(data)
+            else:
+                raise JobError(data)
+
+    def _kill(self):
+        if self.proc and self.proc.is_alive():
+            if hasattr(os, "killpg"):
+                try:
+                    os.killpg(self.proc.pid, signal.SIGKILL)
+                except OSError:
+                    pass  # still bootstrapping, its own process group does not exist yet
+            self.proc.kill()  # no-op once the group kill took it down
+
+    def cancel(self):
+        self.cancelled = True
+        self._kill()
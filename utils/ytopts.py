@@ -0,0 +1,99 @@
+# Copyright (c) 2025 devgagan : https://github.com/devgaganin.
+# Licensed under the GNU General Public License v3.0.
+# See LICENSE file in the repository root for full license text.
+
+import shutil
+import logging
+from urllib.parse import urlsplit
+from config import YTDL_FRAGMENTS, YTDL_FRAGMENTS_YOUTUBE, YTDL_FRAGMENTS_INSTAGRAM, YTDL_ARIA2C, YTDL_CONNECTIONS
+
+logger = logging.getLogger(__name__)
+
+# per-site download settings; Instagram's CDN rate-limits parallel connections, so it gets few
+PROFILES = {
+    "youtube": {"fragments": YTDL_FRAGMENTS_YOUTUBE, "aria2c": True},
+    "instagram": {"fragments": YTDL_FRAGMENTS_INSTAGRAM, "aria2c": False},
+    "generic": {"fragments": YTDL_FRAGMENTS, "aria2c": True},
+}
+
+ARIA2C = shutil.which("aria2c") if YTDL_ARIA2C != "off" else None
+logger.info(f"yt-dlp downloads: {'aria2c at ' + ARIA2C if ARIA2C else 'native downloader'} for direct files")
+
+
+def site(url):
+    host = urlsplit(url).netloc.lower()
+    if host.endswith(("youtube.com", "youtu.be")):
+        return "youtube"
+    if host.endswith("instagram.com"):
+        return "instagram"
+    return "generic"
+
+
+def downloader(url):
+    """yt-dlp options for fetching `url`: parallel HLS/DASH fragments, and aria2c for direct
+    files where it is installed and the site tolerates several connections."""
+    profile = PROFILES[site(url)]
+    opts = {'concurrent_fragment_downloads': profile["fragments"]}
+    if ARIA2C and profile["aria2c"]:
+        opts['external_downloader'] = {'http': 'aria2c'}  # fragmented formats stay on the native downloader
+        opts['external_downloader_args'] = {'aria2c': [
+            '-x', str(YTDL_CONNECTIONS), '-s', str(YTDL_CONNECTIONS), '-k', '1M', '--summary-interval=0']}
+    return opts
+
+
+def _size(formats):
+    sizes = [f.get('filesize') or f.get('filesize_approx') for f in formats]
+    return None if None in sizes else sum(sizes)
+
+
+def _mp4(f):
+    return f.get('ext') in ('mp4', 'm4a')
+
+
+class FormatBudget:
+    """yt-dlp format selector: the best video+audio that fits a byte budget and a height cap.
+
+    Considers combined formats and separate video/audio pairs that can be stream-copied into
+    mp4 (so merging never re-encodes), and takes the tallest, then highest-bitrate, candidate
+    whose known size fits. Without one, candidates of unknown size are tried; failing that
+    the smallest is chosen, and the job's size limit rejects it before the download.
+    """
+
+    def __init__(self, max_bytes, max_height):
+        self.max_bytes, self.max_height = max_bytes, max_height
+
+    def __repr__(self):  # part of the result-cache key
+        return f"FormatBudget({self.max_bytes}, {self.max_height})"
+
+    def __call__(self, ctx):
+        formats = ctx.get('formats') or []
+        video = [f for f in formats if f.get('vcodec') != 'none' and f.get('acodec') == 'none' and _mp4(f)]
+        audio = [f for f in formats if f.get('acodec') != 'none' and f.get('vcodec') == 'none' and _mp4(f)]
+        both = [f for f in formats if f.get('vcodec') != 'none' and f.get('acodec') != 'none']
+        candidates = [(f,) for f in both] + [(v, a) for v in video for a in audio]
+        candidates = [c for c in candidates if (c[0].get('height') or 0) <= self.max_height] or candidates
+        if not candidates:
+            return
+        fitting = [c for c in candidates if _size(c) is not None and _size(c) <= self.max_bytes]
+        fitting = fitting or [c for c in candidates if _size(c) is None]
+        fitting = fitting or [min(candidates, key=_size)]
+        best = max(fitting, key=lambda c: (c[0].get('height') or 0, sum(f.get('tbr') or 0 for f in c)))
+        if len(best) == 1:
+            yield best[0]
+            return
+        v, a = best
+        yield {
+            'format_id': f"{v['format_id']}+{a['format_id']}",
+            'ext': 'mp4',
+            'requested_formats': [v, a],
+            'protocol': f"{v.get('protocol')}+{a.get('protocol')}",
+            'filesize_approx': _size(best),
+        }
+
+
+def describe(opts):
+    """One line for progress messages saying how a job downloads."""
+    fragments = opts.get('concurrent_fragment_downloads') or 1
+    if opts.get('external_downloader'):
+        return f"aria2c ×{YTDL_CONNECTIONS} (direct) / {fragments} fragments (HLS/DASH)"
+    return f"native, {fragments} fragments at once"